@@ -1,26 +1,38 @@
+from array import array
+
 class UF:
+    '''
+    Union-find over elements 0..N-1 with path halving and union by size,
+    parents and sizes are kept in flat int arrays
+    '''
 
     def __init__(self, N):
         self.N = N
         self.count = N
-        self.elements = [ i for i in range(N) ]
+        typecode = 'i' if N < 2**31 else 'q'
+        self.elements = array(typecode, range(N))
+        self.size = array(typecode, [1]) * N
 
     def find(self, p):
-        while p != self.elements[p]:
-            p = self.elements[p]
+        elements = self.elements
+        while p != elements[p]:
+            # path halving: point every other node to its grandparent
+            elements[p] = elements[elements[p]]
+            p = elements[p]
         return p
-    
+
     def connected(self, p, q):
         return self.find(p) == self.find(q)
 
     def union(self, p, q):
+        ''' joins sets of p and q, returns False if they were already joined '''
         root_p = self.find(p)
         root_q = self.find(q)
-        if root_p == root_q: return
+        if root_p == root_q: return False
 
+        # attach the smaller tree under the larger one
+        if self.size[root_p] > self.size[root_q]: root_p, root_q = root_q, root_p
         self.elements[root_p] = root_q
+        self.size[root_q] += self.size[root_p]
         self.count -= 1
-
-    
-
-    
\ No newline at end of file
+        return True
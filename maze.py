@@ -1,4 +1,7 @@
-
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # cardinal directions
 NORTH = 1 << 0
@@ -6,30 +9,79 @@ SOUTH = 1 << 1
 EAST  = 1 << 2
 WEST  = 1 << 3
 
+# wall bits stored per cell; north and west walls of a cell are the
+# south and east walls of its neighbours, so only two bits are needed
+CELL_SOUTH = 1 << 0
+CELL_EAST  = 1 << 1
+CELL_BITS  = 2
+CELLS_PER_BYTE = 8 // CELL_BITS
+
+# unpacked cell codes for every possible packed byte, used by bulk accessors
+_UNPACK = [ bytes((b >> (i * CELL_BITS)) & 3 for i in range(CELLS_PER_BYTE)) for b in range(256) ]
+_NO_SOUTH = bytes(b & ~CELL_SOUTH for b in range(256))
+_NO_EAST  = bytes(b & ~CELL_EAST for b in range(256))
+
+def pack_row(codes):
+    ''' packs a sequence of cell codes into bytes, the way Maze rows are stored '''
+    codes = bytes(codes) + bytes(-len(codes) % CELLS_PER_BYTE)
+    return bytes(
+        codes[i] & 3 | (codes[i+1] & 3) << 2 | (codes[i+2] & 3) << 4 | (codes[i+3] & 3) << 6
+        for i in range(0, len(codes), CELLS_PER_BYTE))
+
 class Maze:
+    '''
+    NxN maze with walls packed 2 bits per cell into a bytearray.
+
+    Each row is padded to a whole number of bytes (`stride`), so a row of
+    cells always starts at a byte boundary. The outer border is not stored:
+    has_wall() always reports it as a wall and wall changes to it are ignored.
+    '''
 
     def __init__(self, N=10, walls=True):
         self.N = N
+        self.stride = (N + CELLS_PER_BYTE - 1) // CELLS_PER_BYTE
 
-        self.north = [ [walls] * N for _ in range(N) ]
-        self.south = [ [walls] * N for _ in range(N) ]
-        self.east  = [ [walls] * N for _ in range(N) ]
-        self.west  = [ [walls] * N for _ in range(N) ]
+        fill = 0xFF if walls else 0x00
+        self.walls = bytearray([fill]) * self.walls_size(N)
+
+    @staticmethod
+    def walls_size(N):
+        ''' returns the size of packed walls of an NxN maze in bytes '''
+        return (N + CELLS_PER_BYTE - 1) // CELLS_PER_BYTE * N
+
+    @classmethod
+    def from_buffer(cls, N, walls):
+        ''' 
+        wraps existing packed walls without copying them, walls can be any
+        buffer supporting item access, e.g. a memoryview of a mmap
+        '''
+        maze = cls.__new__(cls)
+        maze.N = N
+        maze.stride = (N + CELLS_PER_BYTE - 1) // CELLS_PER_BYTE
+        maze.walls = walls
+        return maze
 
     def wall_bilder(self, r,c,side,has_wall):
 
         if side == NORTH:
-            self.north[r][c] = has_wall
-            if r > 0: self.south[r-1][c] = has_wall
+            if r == 0: return
+            r -= 1
+            bit = CELL_SOUTH
         elif side == SOUTH:
-            self.south[r][c] = has_wall
-            if r+1 < self.N: self.north[r+1][c] = has_wall
+            if r+1 >= self.N: return
+            bit = CELL_SOUTH
         elif side == EAST:
-            self.east[r][c] = has_wall
-            if c+1 < self.N: self.west[r][c+1] = has_wall
+            if c+1 >= self.N: return
+            bit = CELL_EAST
         else:
-            self.west[r][c]   = has_wall
-            if c > 0: self.east[r][c-1] = has_wall
+            if c == 0: return
+            c -= 1
+            bit = CELL_EAST
+
+        i = r*self.stride + (c >> 2)
+        bit <<= (c & 3) << 1
+        if has_wall: self.walls[i] |= bit
+        else:        self.walls[i] &= ~bit
 
     def add_wall(self, r,c,side):
         self.wall_bilder(r,c,side,has_wall=True)
@@ -38,8 +90,82 @@ class Maze:
         self.wall_bilder(r,c,side,has_wall=False)
 
     def has_wall(self, r,c,side):
-        if side == NORTH: return self.north[r][c]
-        if side == SOUTH: return self.south[r][c]  
-        if side == EAST: return self.east[r][c]  
-        if side == WEST: return self.west[r][c]  
+        if side == NORTH:
+            if r == 0: return True
+            r -= 1
+            bit = CELL_SOUTH
+        elif side == SOUTH:
+            if r+1 >= self.N: return True
+            bit = CELL_SOUTH
+        elif side == EAST:
+            if c+1 >= self.N: return True
+            bit = CELL_EAST
+        else:
+            if c == 0: return True
+            c -= 1
+            bit = CELL_EAST
+
+        return (self.walls[r*self.stride + (c >> 2)] >> ((c & 3) << 1)) & bit != 0
+
+    # --- bulk accessors
+    #
+    # Rows and columns are exchanged as bytes of N cell codes, one byte per
+    # cell holding CELL_SOUTH | CELL_EAST bits, the whole grid as an NxN 
+    # NumPy array of such codes. Border bits are ignored on read and write.
+
+    def get_row(self, r):
+        ''' returns cell codes of row r '''
+        packed = self.walls[r*self.stride:(r+1)*self.stride]
+        codes = bytearray(b''.join([ _UNPACK[b] for b in packed ])[:self.N])
+        if r+1 >= self.N: codes = codes.translate(_NO_SOUTH)
+        codes[-1] &= ~CELL_EAST
+        return bytes(codes)
+
+    def set_row(self, r, codes):
+        ''' sets walls of row r from a sequence of N cell codes '''
+        self.walls[r*self.stride:(r+1)*self.stride] = pack_row(codes)
+
+    def get_col(self, c):
+        ''' returns cell codes of column c '''
+        shift = (c & 3) << 1
+        codes = bytearray((b >> shift) & 3 for b in self.walls[c >> 2::self.stride])
+        if c+1 >= self.N: codes = codes.translate(_NO_EAST)
+        codes[-1] &= ~CELL_SOUTH
+        return bytes(codes)
+
+    def set_col(self, c, codes):
+        ''' sets walls of column c from a sequence of N cell codes '''
+        shift = (c & 3) << 1
+        mask = ~(3 << shift) & 0xFF
+        i = c >> 2
+        for code in codes:
+            self.walls[i] = (self.walls[i] & mask) | ((code & 3) << shift)
+            i += self.stride
+
+    def get_codes(self):
+        ''' returns an NxN NumPy uint8 array of cell codes '''
+        packed = np.frombuffer(self.walls, dtype=np.uint8).reshape(self.N, self.stride)
+        shifts = np.arange(0, 8, CELL_BITS, dtype=np.uint8)
+        codes = ((packed[:,:,None] >> shifts) & 3).reshape(self.N, -1)[:,:self.N].copy()
+        codes[-1] &= CELL_EAST
+        codes[:,-1] &= CELL_SOUTH
+        return codes
+
+    def set_codes(self, codes):
+        ''' sets all walls from an NxN NumPy array of cell codes '''
+        padded = np.zeros((self.N, self.stride * CELLS_PER_BYTE), dtype=np.uint8)
+        padded[:,:self.N] = codes & 3
+        padded = padded.reshape(self.N, self.stride, CELLS_PER_BYTE)
+        packed = padded[:,:,0] | padded[:,:,1] << 2 | padded[:,:,2] << 4 | padded[:,:,3] << 6
+        self.walls[:] = packed.tobytes()
 
+    def remove_walls(self, cells, bit):
+        '''
+        removes the CELL_SOUTH or CELL_EAST wall of every cell in a NumPy
+        array of flat cell indices r*N + c, leaving all other bits as they
+        are, the way remove_wall() does one by one
+        '''
+        r, c = np.divmod(cells, self.N)
+        shift = ((c & 3) << 1).astype(np.uint8)
+        packed = np.frombuffer(self.walls, dtype=np.uint8)
+        np.bitwise_and.at(packed, r*self.stride + (c >> 2), ~(np.uint8(bit) << shift))
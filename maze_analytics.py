@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+'''
+Maze statistics computed with NumPy: dead ends, branching, corridor lengths
+and the longest path.
+
+Everything starts from the NxN array of cell codes (Maze.get_codes()),
+turned into a compact adjacency table of 4 neighbours per cell, -1 where
+there is a wall. Degrees come from the table directly. BFS expands a whole
+level at a time with array operations; two BFS passes give the diameter,
+the longest path of a perfect maze. Corridors, runs of cells with exactly
+two openings, are found in the BFS tree of the first pass by pointer
+jumping. Metrics are exact for perfect mazes, for mazes with loops BFS
+distances and corridors follow the BFS tree.
+
+Batches of maze files, e.g. written by maze_batch.py, are analyzed by a
+process pool.
+'''
+
+import maze_file
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import sys
+import maze as mz
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# neighbour slots of the adjacency table
+SLOT_NORTH, SLOT_SOUTH, SLOT_WEST, SLOT_EAST = range(4)
+
+def adjacency(maze):
+    ''' returns an (N*N, 4) array of neighbour cells of every cell, -1 behind walls '''
+    if np is None:
+        raise ImportError('Maze analytics require numpy')
+
+    N = maze.N
+    codes = maze.get_codes()
+    dtype = np.int32 if N*N < 2**31 else np.int64
+    cells = np.arange(N*N, dtype=dtype).reshape(N, N)
+
+    # walls on the outer border are not stored, codes report them open
+    south = codes & mz.CELL_SOUTH == 0
+    south[-1] = False
+    east = codes & mz.CELL_EAST == 0
+    east[:,-1] = False
+
+    nbrs = np.full((N, N, 4), -1, dtype=dtype)
+    nbrs[:-1,:,SLOT_SOUTH] = np.where(south[:-1], cells[1:], -1)
+    nbrs[1:,:,SLOT_NORTH]  = np.where(south[:-1], cells[:-1], -1)
+    nbrs[:,:-1,SLOT_EAST]  = np.where(east[:,:-1], cells[:,1:], -1)
+    nbrs[:,1:,SLOT_WEST]   = np.where(east[:,:-1], cells[:,:-1], -1)
+    return nbrs.reshape(N*N, 4)
+
+def bfs(nbrs, start, tree=True):
+    '''
+    returns distances from start, -1 for cells not reached, and BFS parents,
+    the start being its own parent; loops need extra work unless tree is set
+    '''
+    NN = len(nbrs)
+    dist = np.full(NN, -1, dtype=nbrs.dtype)
+    parent = np.full(NN, -1, dtype=nbrs.dtype)
+    dist[start] = 0
+    parent[start] = start
+
+    frontier = np.array([ start ], dtype=nbrs.dtype)
+    level = 0
+    while frontier.size:
+        level += 1
+        cells = nbrs[frontier].ravel()
+        sources = np.repeat(frontier, 4)
+
+        new = cells >= 0
+        cells, sources = cells[new], sources[new]
+        new = dist[cells] < 0
+        cells, sources = cells[new], sources[new]
+
+        # in a tree no cell is reached twice on one level
+        if not tree: cells, first = np.unique(cells, return_index=True); sources = sources[first]
+
+        dist[cells] = level
+        parent[cells] = sources
+        frontier = cells
+
+    return dist, parent
+
+def corridors(parent, degree):
+    ''' returns lengths in cells of corridors, maximal runs of cells of degree 2, along BFS parents '''
+    corridor = degree == 2
+    if not corridor.any(): return np.zeros(0, dtype=np.int64)
+
+    # every corridor cell points to its parent while the parent is in the corridor too,
+    # pointer jumping then takes all cells to the top of their run
+    up = np.where(corridor[parent], parent, np.arange(len(parent), dtype=parent.dtype))
+    while True:
+        jumped = up[up]
+        if np.array_equal(jumped, up): break
+        up = jumped
+
+    return np.unique(up[corridor], return_counts=True)[1]
+
+def analyze(maze):
+    ''' returns a dict of metrics of a maze '''
+    N = maze.N
+    nbrs = adjacency(maze)
+    degree = (nbrs >= 0).sum(axis=1)
+    tree = int(degree.sum()) // 2 == N*N - 1
+
+    # diameter: the farthest cell from anywhere is an end of a longest path
+    dist, parent = bfs(nbrs, 0, tree)
+    a = int(dist.argmax())
+    dist_a, _ = bfs(nbrs, a, tree)
+    b = int(dist_a.argmax())
+
+    lengths = corridors(parent, degree)
+    ways_on = degree[degree >= 2] - 1
+    counts = np.bincount(degree, minlength=5)
+
+    return {
+        'N': N,
+        'perfect': bool(tree and (dist >= 0).all()),
+        'degrees': counts.tolist(),
+        'dead_ends': int(counts[1]),
+        'dead_end_ratio': counts[1] / (N*N),
+        'junctions': int(counts[3:].sum()),
+        'branching_factor': float(ways_on.mean()) if ways_on.size else 0.0,
+        'corridors': int(lengths.size),
+        'corridor_mean': float(lengths.mean()) if lengths.size else 0.0,
+        'corridor_max': int(lengths.max()) if lengths.size else 0,
+        'corridor_lengths': np.bincount(lengths).tolist() if lengths.size else [],
+        'diameter': int(dist_a[b]),
+        'diameter_ends': [ divmod(a, N), divmod(b, N) ],
+    }
+
+def analyze_file(path):
+    result = analyze(maze_file.load(path))
+    result['path'] = path
+    return result
+
+def analyze_files(paths, workers=None, chunk=16):
+    ''' returns metrics of maze files in paths order, computed by a process pool; 0 workers analyze in this process '''
+    if workers == 0: return [ analyze_file(path) for path in paths ]
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(analyze_file, paths, chunksize=chunk))
+
+def summary(results):
+    '''
+    returns metrics over a batch: mean, min and max of every number, degree
+    counts and corridor length counts summed up
+    '''
+    keys = [ 'dead_end_ratio', 'branching_factor', 'corridor_mean', 'corridor_max', 'diameter' ]
+    stats = { key: {
+        'mean': sum(r[key] for r in results) / len(results),
+        'min': min(r[key] for r in results),
+        'max': max(r[key] for r in results) } for key in keys }
+
+    lengths = [ 0 ] * max(len(r['corridor_lengths']) for r in results)
+    for r in results:
+        for length, count in enumerate(r['corridor_lengths']): lengths[length] += count
+
+    stats['mazes'] = len(results)
+    stats['perfect'] = sum(r['perfect'] for r in results)
+    stats['degrees'] = [ sum(r['degrees'][d] for r in results) for d in range(5) ]
+    stats['corridor_lengths'] = lengths
+    return stats
+
+def maze_paths(names):
+    ''' returns maze files named, with *.maze files of directories '''
+    paths = []
+    for name in names:
+        if os.path.isdir(name): paths.extend(sorted(glob.glob(os.path.join(name, '*.maze'))))
+        else: paths.append(name)
+    return paths
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Computes dead end, branching, corridor and longest path statistics of maze files.')
+    parser.add_argument('mazes',       nargs='+',             help="maze files or directories of them, e.g. written by maze_batch.py")
+    parser.add_argument('-j',          default=None, type=int,help="number of worker processes, 0 to run in this process; defaults to CPU count")
+    parser.add_argument('--chunk',     default=16, type=int,  help="mazes per task")
+    parser.add_argument('-v',          action="store_true",   help="print metrics of every maze")
+    parser.add_argument('-o',          default=None,          help="write metrics of every maze and the summary to a JSON file")
+    args = parser.parse_args()
+
+    if np is None:
+        print('Error: maze analytics require numpy', file=sys.stderr)
+        sys.exit(1)
+
+    paths = maze_paths(args.mazes)
+    if not paths:
+        print('Error: no maze files found', file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        results = analyze_files(paths, workers=args.j, chunk=args.chunk)
+    except (OSError, maze_file.MazeFileException) as err:
+        print('Error: %s' % err, file=sys.stderr)
+        sys.exit(1)
+
+    if args.v:
+        for r in results:
+            print('%-40s dead ends %6.2f%%  branching %5.3f  corridors %7d (mean %6.2f, max %6d)  diameter %d' %
+                (r['path'], r['dead_end_ratio'] * 100, r['branching_factor'],
+                 r['corridors'], r['corridor_mean'], r['corridor_max'], r['diameter']))
+
+    stats = summary(results)
+    print('%d mazes, %d perfect' % (stats['mazes'], stats['perfect']))
+    for key in [ 'dead_end_ratio', 'branching_factor', 'corridor_mean', 'corridor_max', 'diameter' ]:
+        print('    %-20s mean %12.4f  min %12.4f  max %12.4f' % (key, stats[key]['mean'], stats[key]['min'], stats[key]['max']))
+    print('    %-20s %s' % ('cells by degree', ' '.join('%d:%d' % (d, n) for d, n in enumerate(stats['degrees']))))
+
+    if args.o:
+        with open(args.o, 'w') as f: json.dump({ 'mazes': results, 'summary': stats }, f, indent=1)
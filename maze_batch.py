@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+
+'''
+Batch generation of seeded mazes using a process pool.
+
+Every maze is generated from its own seed only, and seeds are split into
+fixed size chunks, so files written are the same whatever the number of
+workers is.
+'''
+
+import maze
+import maze_generators
+import maze_visualizer
+import maze_file
+import maze_random
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+from maze_generators import ALGS_LIST
+
+def maze_path(outdir, alg, N, seed):
+    return os.path.join(outdir, 'maze-a%d-n%d-s%d.maze' % (alg, N, seed))
+
+def build_chunk(alg, mode, N, seeds, outdir):
+    ''' generates and saves mazes for a chunk of seeds, returns (pid, count, seconds) '''
+    started = time.perf_counter()
+
+    for seed in seeds:
+        m = maze.Maze(N=N, walls=ALGS_LIST[alg]['walls'])
+        maze_generators.generate(alg, m, maze_visualizer.NullVisualizer(m), mode=mode, rng=maze_random.MazeRandom(seed))
+
+        maze_file.save(m, maze_path(outdir, alg, N, seed), alg=alg, params=mode, seed=seed)
+
+    return os.getpid(), len(seeds), time.perf_counter() - started
+
+def run_batch(alg, mode, N, seeds, outdir, workers=None, chunk=16, inflight=None):
+    '''
+    generates mazes for all seeds, keeping at most `inflight` chunks
+    submitted at a time; returns {pid: [mazes, seconds]}
+    '''
+    os.makedirs(outdir, exist_ok=True)
+
+    chunks = ( seeds[i:i+chunk] for i in range(0, len(seeds), chunk) )
+    stats = {}
+
+    def account(pid, count, elapsed):
+        pid_stats = stats.setdefault(pid, [0, 0.0])
+        pid_stats[0] += count
+        pid_stats[1] += elapsed
+
+    # no pool, handy for debugging and profiling
+    if workers == 0:
+        for part in chunks: account(*build_chunk(alg, mode, N, part, outdir))
+        return stats
+
+    if workers is None: workers = os.cpu_count() or 1
+    if inflight is None: inflight = 2 * workers
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+
+        for part in chunks:
+            if len(pending) >= inflight:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done: account(*future.result())
+
+            pending.add(pool.submit(build_chunk, alg, mode, N, part, outdir))
+
+        for future in concurrent.futures.as_completed(pending):
+            account(*future.result())
+
+    return stats
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Generates NxN mazes for a range of seeds in parallel, one maze_file per maze.')
+    parser.add_argument('-n',          default=10, type=int,  help="maze size")
+    parser.add_argument('-a',          default=0, type=int,   help="maze generation algorithm, see maze_client.py --algs")
+    parser.add_argument('-p',          type=str,              help="algorithm parameters")
+    parser.add_argument('--seeds',     nargs=2, type=int,     required=True, metavar=('first', 'last'), help="seed range, last seed excluded")
+    parser.add_argument('-o',          default='mazes',       help="output directory")
+    parser.add_argument('-j',          default=None, type=int,help="number of worker processes, 0 to run in this process; defaults to CPU count")
+    parser.add_argument('--chunk',     default=16, type=int,  help="seeds per task")
+    parser.add_argument('--inflight',  default=None, type=int,help="max tasks submitted at once, defaults to twice the workers")
+    args = parser.parse_args()
+
+    if args.a not in range(len(ALGS_LIST)):
+        print('Error: unknown algorithm %d' % args.a, file=sys.stderr)
+        sys.exit(1)
+
+    # fail early on a bad configuration rather than in every worker
+    try:
+        maze_generators.generate(args.a, maze.Maze(N=1), maze_visualizer.NullVisualizer(), mode=args.p)
+    except maze_generators.AlgConfigException as err:
+        print(err)
+        sys.exit(2)
+
+    seeds = range(*args.seeds)
+    started = time.perf_counter()
+    stats = run_batch(args.a, args.p, args.n, seeds, args.o, workers=args.j, chunk=args.chunk, inflight=args.inflight)
+    elapsed = time.perf_counter() - started
+
+    for pid, (count, seconds) in sorted(stats.items()):
+        rate = count / seconds if seconds else 0
+        print('worker %-8d %8d mazes %8.2f sec %10.1f mazes/sec %12.0f cells/sec' %
+            (pid, count, seconds, rate, rate * args.n ** 2))
+
+    print('total %d mazes of %dx%d in %.2f sec, %.1f mazes/sec' %
+        (len(seeds), args.n, args.n, elapsed, len(seeds) / elapsed if elapsed else 0))
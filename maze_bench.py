@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+'''
+Benchmarks all maze generators and solvers headlessly over a ladder of
+maze sizes with fixed seeds.
+
+Every case is timed without tracing and then run once more under tracemalloc
+for its peak memory. Results are written as JSON, and two result files can
+be compared to flag regressions.
+'''
+
+import maze
+import maze_generators
+import maze_random
+import maze_solver
+import maze_visualizer
+import argparse
+import datetime
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from maze_generators import ALGS_LIST
+
+SIZES   = [ 16, 32, 64, 128 ]
+SEEDS   = [ 1, 2, 3 ]
+SOLVERS = [ 'dfs', 'bfs', 'fast_bfs', 'astar', 'bidir_bfs', 'wall_follower' ]
+
+# growing tree policies, its parameter in ALGS_LIST is only a template
+GROWING_TREE_MODES = [ 'r', 'n', 'o', 'm', 'u', 'n:1,r:1', 'n:1,o:1', 'o:1,r:1' ]
+
+# solvers run on mazes made by this algorithm
+SOLVER_ALG = 1
+
+def gen_cases(algs=None):
+    ''' yields (alg, mode) for every algorithm and each of its modes '''
+    for alg, desc in enumerate(ALGS_LIST):
+        if algs is not None and alg not in algs: continue
+
+        if desc['cls'] is maze_generators.GrowingTree: modes = GROWING_TREE_MODES
+        elif desc['param']: modes = desc['param']
+        else: modes = [ None ]
+
+        for mode in modes: yield alg, mode
+
+def run_gen(alg, mode, N, seed, bulk=False):
+    m = maze.Maze(N=N, walls=ALGS_LIST[alg]['walls'])
+    maze_generators.generate(alg, m, maze_visualizer.NullVisualizer(m), mode=mode, rng=maze_random.MazeRandom(seed, bulk=bulk))
+    return m
+
+def run_sol(solver, m, seed, bulk=False):
+    rng = maze_random.MazeRandom(seed, bulk=bulk)
+    getattr(maze_solver, solver)(m, maze_visualizer.NullVisualizer(m), 0, 0, m.N-1, m.N-1, rng=rng)
+
+def measure(fn, repeat):
+    ''' returns (best seconds over repeat runs, peak traced bytes of one run) '''
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best: best = elapsed
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return best, peak
+
+def result(key, kind, name, N, seconds, peak, cells):
+    return {
+        'key': key, 'kind': kind, 'name': name, 'N': N,
+        'seconds': seconds, 'peak_bytes': peak,
+        'cells_per_sec': cells / seconds if seconds else None
+    }
+
+def run_benchmarks(sizes=SIZES, seeds=SEEDS, algs=None, solvers=SOLVERS, repeat=1, log=None, bulk=False):
+    '''
+    runs all cases, returns a list of result dicts; seconds and peak bytes
+    are summed over seeds, bulk draws random numbers in bulk
+    '''
+    results = []
+
+    for N in sizes:
+        for alg, mode in gen_cases(algs):
+            name = ALGS_LIST[alg]['name'] + (' (%s)' % mode if mode else '')
+            seconds = peak = 0
+            try:
+                for seed in seeds:
+                    t, p = measure(lambda: run_gen(alg, mode, N, seed, bulk), repeat)
+                    seconds += t
+                    peak = max(peak, p)
+            except maze_generators.AlgConfigException as err:
+                if log: log('skipped %s: %s' % (name, err))
+                continue
+
+            results.append(result('gen:%d:%s:%d' % (alg, mode, N), 'gen', name, N, seconds, peak, N * N * len(seeds)))
+            if log: log('%-40s N=%-6d %9.4f sec %12d bytes' % (name, N, seconds, peak))
+
+        mazes = [ run_gen(SOLVER_ALG, None, N, seed, bulk) for seed in seeds ]
+        for solver in solvers:
+            seconds = peak = 0
+            for seed, m in zip(seeds, mazes):
+                t, p = measure(lambda: run_sol(solver, m, seed, bulk), repeat)
+                seconds += t
+                peak = max(peak, p)
+
+            results.append(result('sol:%s:%d' % (solver, N), 'sol', solver, N, seconds, peak, N * N * len(seeds)))
+            if log: log('%-40s N=%-6d %9.4f sec %12d bytes' % ('solver ' + solver, N, seconds, peak))
+
+    return results
+
+def compare(old, new, threshold=0.1):
+    '''
+    compares two result files, returns a list of (key, old seconds, new seconds,
+    ratio) of cases slower than old by more than threshold
+    '''
+    before = { r['key']: r for r in old['results'] }
+    regressions = []
+
+    for r in new['results']:
+        o = before.get(r['key'])
+        if o is None or not o['seconds']: continue
+
+        ratio = r['seconds'] / o['seconds']
+        if ratio > 1 + threshold:
+            regressions.append((r['key'], o['seconds'], r['seconds'], ratio))
+
+    return regressions
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Benchmarks maze generators and solvers, or compares two benchmark results.')
+    parser.add_argument('-n',          nargs='+', type=int, default=SIZES, help="maze sizes")
+    parser.add_argument('-s',          nargs='+', type=int, default=SEEDS, help="random seeds, times are summed over them")
+    parser.add_argument('-a',          nargs='+', type=int, default=None,  help="generation algorithms to run, all by default")
+    parser.add_argument('--solvers',   nargs='*', default=SOLVERS, choices=SOLVERS, help="solvers to run")
+    parser.add_argument('--bulk_rng',  action="store_true", help="draw random numbers in bulk, see maze_random.py")
+    parser.add_argument('-r',          default=1, type=int, help="repeat each case, the best time is kept")
+    parser.add_argument('-o',          default=None, help="write results to a JSON file")
+    parser.add_argument('--compare',   nargs=2, metavar=('OLD', 'NEW'), help="compare two result files and flag regressions")
+    parser.add_argument('--threshold', default=0.1, type=float, help="slowdown ratio reported as a regression, default 0.1")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f: old = json.load(f)
+        with open(args.compare[1]) as f: new = json.load(f)
+
+        regressions = compare(old, new, args.threshold)
+        for key, before, after, ratio in regressions:
+            print('REGRESSION %-32s %9.4f -> %9.4f sec (%+.0f%%)' % (key, before, after, (ratio-1) * 100))
+        print('%d regressions over %d%%' % (len(regressions), args.threshold * 100))
+        sys.exit(1 if regressions else 0)
+
+    results = run_benchmarks(sizes=args.n, seeds=args.s, algs=args.a, solvers=args.solvers, repeat=args.r, log=print, bulk=args.bulk_rng)
+
+    if args.o:
+        report = {
+            'meta': {
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'sizes': args.n, 'seeds': args.s, 'repeat': args.r, 'bulk_rng': args.bulk_rng
+            },
+            'results': results
+        }
+        with open(args.o, 'w') as f: json.dump(report, f, indent=1)
@@ -0,0 +1,140 @@
+'''
+Giant mazes generated lazily in chunks.
+
+The maze is split into square chunks, each one an independent perfect maze
+generated on demand from (seed, chunk row, chunk column) with any
+ALGS_LIST algorithm. Chunks are stitched into one perfect maze by a
+spanning tree over the chunks: every chunk but the top-left one opens a
+single passage to its north or west neighbour, and the choice and the
+position of the passage are hashed from the seed and chunk coordinates.
+Anything about a chunk can therefore be recomputed at any time, and only
+recently used chunks are kept, in an LRU cache limited by memory.
+'''
+
+import maze as mz
+import maze_generators
+import maze_visualizer
+import maze_random
+from collections import OrderedDict
+from maze_random import mix
+
+SET_SOUTH = bytes(b | mz.CELL_SOUTH for b in range(256))
+
+# hash salts
+SALT_CHUNK = 1
+SALT_LINK  = 2
+
+class ChunkedMaze:
+    '''
+    NxN perfect maze made of chunk x chunk mazes generated on demand.
+
+    has_wall() has the same semantics as Maze.has_wall() and pages chunks
+    in as needed; at most cache_bytes of chunk walls are kept. The maze is
+    read-only, add_wall() and remove_wall() raise TypeError.
+    '''
+
+    def __init__(self, N, chunk=128, seed=0, alg=1, mode=None, cache_bytes=64 << 20):
+        if N % chunk:
+            raise ValueError('Maze size %d is not a multiple of chunk size %d' % (N, chunk))
+        if not maze_generators.ALGS_LIST[alg]['walls']:
+            raise ValueError('Algorithm %d does not carve walls, cannot be used for chunks' % alg)
+
+        self.N = N
+        self.chunk = chunk
+        self.chunks = N // chunk
+        self.seed = seed
+        self.alg = alg
+        self.mode = mode
+        self.cache_bytes = cache_bytes
+
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def link(self, cr, cc):
+        '''
+        returns (side, offset) of the passage chunk (cr,cc) opens to its
+        north or west neighbour, offset counts along the shared border;
+        the top-left chunk returns (None, 0)
+        '''
+        h = mix(self.seed, SALT_LINK, cr, cc)
+        offset = (h >> 1) % self.chunk
+
+        if cr == 0 and cc == 0: return None, 0
+        if cr == 0: return mz.WEST, offset
+        if cc == 0: return mz.NORTH, offset
+        return (mz.NORTH if h & 1 else mz.WEST), offset
+
+    def generate(self, cr, cc):
+        ''' generates chunk (cr,cc), results depend on its coordinates only '''
+        m = mz.Maze(N=self.chunk)
+        rng = maze_random.MazeRandom(self.seed, SALT_CHUNK, cr, cc)
+        maze_generators.generate(self.alg, m, maze_visualizer.NullVisualizer(m), mode=self.mode, rng=rng)
+        return m
+
+    def get_chunk(self, cr, cc):
+        ''' returns chunk (cr,cc), generating it if it is not cached '''
+        key = (cr, cc)
+        m = self.cache.get(key)
+        if m is not None:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return m
+
+        self.misses += 1
+        m = self.generate(cr, cc)
+        self.cache[key] = m
+        self.cached_bytes += len(m.walls)
+
+        # evict least recently used chunks, always keeping the new one
+        while self.cached_bytes > self.cache_bytes and len(self.cache) > 1:
+            _, old = self.cache.popitem(last=False)
+            self.cached_bytes -= len(old.walls)
+            self.evictions += 1
+
+        return m
+
+    def has_wall(self, r,c,side):
+        ch = self.chunk
+        cr, lr = divmod(r, ch)
+        cc, lc = divmod(c, ch)
+
+        # walls crossing a chunk border are closed except for chunk links
+        if side == mz.NORTH and lr == 0:
+            return r == 0 or self.link(cr, cc) != (mz.NORTH, lc)
+        if side == mz.SOUTH and lr == ch-1:
+            return r+1 >= self.N or self.link(cr+1, cc) != (mz.NORTH, lc)
+        if side == mz.WEST and lc == 0:
+            return c == 0 or self.link(cr, cc) != (mz.WEST, lr)
+        if side == mz.EAST and lc == ch-1:
+            return c+1 >= self.N or self.link(cr, cc+1) != (mz.WEST, lr)
+
+        return self.get_chunk(cr, cc).has_wall(lr,lc,side)
+
+    def add_wall(self, r,c,side):
+        raise TypeError('ChunkedMaze is read-only')
+
+    def remove_wall(self, r,c,side):
+        raise TypeError('ChunkedMaze is read-only')
+
+    def get_row(self, r):
+        ''' returns cell codes of row r, see Maze.get_row() '''
+        ch = self.chunk
+        cr, lr = divmod(r, ch)
+        codes = bytearray()
+
+        for cc in range(self.chunks):
+            part = bytearray(self.get_chunk(cr, cc).get_row(lr))
+
+            # chunk borders are walls unless linked, maze borders are not stored
+            if cc+1 < self.chunks and self.link(cr, cc+1) != (mz.WEST, lr):
+                part[-1] |= mz.CELL_EAST
+
+            if lr == ch-1 and cr+1 < self.chunks:
+                side, offset = self.link(cr+1, cc)
+                part = part.translate(SET_SOUTH)
+                if side == mz.NORTH: part[offset] &= ~mz.CELL_SOUTH
+
+            codes += part
+
+        return bytes(codes)
@@ -4,20 +4,16 @@ import maze
 import maze_generators
 import maze_solver
 import maze_visualizer
-import tkinter
+import maze_file
+import maze_stats
+import maze_events
+import maze_random
 import time
 import argparse
-import random
+import contextlib
+import os
 import sys
-
-ALGS_LIST = [
-    { 'name': 'Recursive split', 'param': [ 'halves', 'random' ], 'walls': False },
-    { 'name': 'Recursive backtracking', 'param':  None, 'walls': True },
-    { 'name': 'Hunt-and-kill',   'param':  None, 'walls': True },
-    { 'name': "Kruskal's",       'param':  None, 'walls': True },
-    { 'name': 'Binary tree',     'param': [ 'NE','NW','SE','SW'], 'walls': True },
-    { 'name': 'Growing tree',    'param': [ '<policy:weight>[,<policy:weight>...]'], 'walls': True }
-]
+from maze_generators import ALGS_LIST
 
 def show_algs():
     ''' Lists supported maze generation algorithms '''
@@ -28,10 +24,17 @@ def show_algs():
 
     footer = '''
 All parameters are optional, algorithms use built-in defaults.
+
+NumPy algorithms compute the whole maze with array operations and need numpy 
+installed. Kruskal's algorithm "fast" mode shuffles edges with NumPy, it is 
+much faster for large mazes but produces different mazes for the same seed.
+
+Wilson's algorithm makes every maze equally likely. Its "aldous-broder" mode 
+does too with a single random walk, which is slower on big mazes.
     
 Growing tree algorithm supports following policies:
 
-    o|oldest,n|newest,r|random,m|middle
+    o|oldest,n|newest,r|random,m|middle,u|unordered
 
 Default policy is "r" which always select the oldest element from stack
 which effectively implements Prim's algorithm. Other interesting combinations:
@@ -43,6 +46,8 @@ which effectively implements Prim's algorithm. Other interesting combinations:
     n:1,o:1 Pick the newest or oldest cell with equal probability (50/50)
     n:2,o:1 Pick the newest or oldest cell with 2:1 ratio
     o:1,r:1 Pick the oldest or random cell with equal probability (50/50)
+    u       Pick a random cell without keeping the stack order, same as "r"
+            but faster on big mazes; gives different mazes for the same seed
     
 '''
     print(footer)
@@ -60,24 +65,75 @@ parser_gen.add_argument('-a',            default=0, type=int,   help="maze gener
 parser_gen.add_argument('--algs',        action="store_true",   help="list supported maze generation algorithms")
 parser_gen.add_argument('-p',            type=str,  help="algorithm parameters, see alg list for details")
 parser_gen.add_argument('-s',            default=None, type=int,help="random seed, use to generate repeatable mazes")
+parser_gen.add_argument('--bulk_rng',    action="store_true",   help="draw random numbers in bulk, faster but a seed gives other mazes than without it; the solver then draws from its own stream of the seed")
+parser_gen.add_argument('--save',        metavar='FILE',        help="save the generated maze to a file")
+parser_gen.add_argument('--load',        metavar='FILE',        help="load a saved maze instead of generating one")
+
+parser_stream = parser.add_argument_group('endless maze streaming')
+parser_stream.add_argument('--stream',      type=int, metavar='ROWS', help="stream an Eller's maze N cells wide row by row as text, 0 for endless")
+parser_stream.add_argument('--stream_file', metavar='FILE',          help="write streamed rows to a file, packed the way maze files store walls")
 
 parser_vis = parser.add_argument_group('maze visualization')
-parser_vis.add_argument('-d',            default=0, type=float, help="simulation delay in seconds, can be a fraction")
+parser_vis.add_argument('-d',            default=0, type=float, help="animation speed in seconds per step, can be a fraction")
+parser_vis.add_argument('--fps',         default=60, type=int,  help="max animation frames per second")
 parser_vis.add_argument('--start_delay', default=2, type=int,   help="start delay in seconds, can be a fraction")
 parser_vis.add_argument('--animate',     default='both', choices=['no','gen','sol','both'], help="algorithms animation")
 parser_vis.add_argument('-w',            default=10, type=int,  help="tile width in px")
+parser_vis.add_argument('--raster',      action="store_true",   help="draw the maze as one image, much faster to start for big mazes")
+parser_vis.add_argument('--ascii',       action="store_true",   help="draw the maze in the terminal instead of a window")
+parser_vis.add_argument('--record',      metavar='FILE',        help="record generation and solving to an event log instead of showing them, see maze_events.py")
+parser_vis.add_argument('--headless',    action="store_true",   help="run without a window or delays, print timings only")
 
 parser_sol = parser.add_argument_group('maze solving')
 parser_sol.add_argument('--start',       nargs=2, type=int,     help="maze entrance coordinates", default=[0,0], metavar=('row', 'col'))
 parser_sol.add_argument('--finish',      nargs=2, type=int,     help="maze exit coordinates", metavar=('row', 'col'))
-parser_sol.add_argument('--solver', default='dfs', choices=['dfs','bfs'], help="maze solver algorithm")
+parser_sol.add_argument('--solver', default='dfs', choices=['dfs','bfs','fast_bfs','astar','bidir_bfs','wall_follower'], help="maze solver algorithm")
+parser_sol.add_argument('--route',       metavar='FILE',        help="write the route of wall_follower to a file, one heading byte per step")
+
+parser_stats = parser.add_argument_group('instrumentation')
+parser_stats.add_argument('--stats',       action="store_true",   help="count hot operations, print them with phase timings")
+parser_stats.add_argument('--profile',     choices=['generate','solve'], help="profile a phase with cProfile")
+parser_stats.add_argument('--profile_file',default=None, metavar='FILE', help="cProfile dump file, defaults to maze-<phase>.prof")
 args = parser.parse_args()
 
+# recording runs at full speed without a window
+if args.record: args.headless = True
+
 # show supported algorithms and exit
 if args.algs or args.a not in range(len(ALGS_LIST)):
     show_algs()
     sys.exit()
 
+# stream rows of an Eller's maze, it only keeps one row in memory
+if args.stream is not None:
+    rows = maze_generators.eller_rows(args.n, args.stream or None, rng=maze_random.MazeRandom(args.s, bulk=args.bulk_rng))
+
+    try:
+        if args.stream_file:
+            with open(args.stream_file, 'wb') as f:
+                for codes in rows: f.write(maze.pack_row(codes))
+        else:
+            print(maze_visualizer.ascii_border(args.n))
+            for codes in rows: print(maze_visualizer.ascii_row(codes), flush=True)
+    except BrokenPipeError:
+        # endless streams end when the reader goes away, stdout is pointed
+        # at devnull so flushing it on exit does not fail again
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(1)
+    sys.exit()
+
+# saved mazes are memory-mapped, so opening is instant whatever the size
+loaded = None
+if args.load:
+    try:
+        loaded = maze_file.load(args.load)
+    except (OSError, maze_file.MazeFileException) as err:
+        print('Error: cannot load %s: %s' % (args.load, err), file=sys.stderr)
+        sys.exit(1)
+    args.n = loaded.N
+
 # check start/finish coordinates are valid
 x, y = args.start
 if x < 0 or x >= args.n or y < 0 or y >= args.n:
@@ -91,59 +147,125 @@ if x < 0 or x >= args.n or y < 0 or y >= args.n:
     print('Error: finishing position [%d,%d] is out of maze [0..%d]' % (x,y,args.n-1), file=sys.stderr)
     sys.exit(1)
 
-# init random generator
-random.seed(args.s)
-sys.setrecursionlimit(10**6) 
+if args.route and args.solver != 'wall_follower':
+    print('Error: --route needs --solver wall_follower', file=sys.stderr)
+    sys.exit(1)
 
-# create tkinter root
-tk = tkinter.Tk()
-tk.title('Maze')
-tk.geometry('+100+100')
-tk.lift()
+# by default the solver goes on drawing where the generator stopped, the
+# way both drew from the random module, so seeds replay earlier runs; with
+# bulk draws it gets its own stream of the seed
+rng = maze_random.MazeRandom(args.s, bulk=args.bulk_rng)
+solver_rng = rng.spawn(maze_random.STREAM_SOLVER) if args.bulk_rng else rng
 
 # create a maze; some algs start with an empty maze and build walls, 
 # others carve doors in a maze full of walls
-m = maze.Maze(N=args.n, walls=ALGS_LIST[args.a]['walls'])
+if loaded: m = loaded
+else: m = maze.Maze(N=args.n, walls=ALGS_LIST[args.a]['walls'])
 
-# create visualizator to use with generation and solving of the maze
-vis = maze_visualizer.MazeVisualizer(m, tk, tile_width=args.w, delay=args.d)
-vis.draw_maze()
-vis.set_statusbar('Start delay: %d sec ...' % args.start_delay)
-time.sleep(args.start_delay)
+# create visualizator to use with generation and solving of the maze;
+# headless runs never import tkinter
+if args.record:
+    vis = maze_events.EventRecorder(m, args.record)
+elif args.headless:
+    vis = maze_visualizer.NullVisualizer(m)
+else:
+    if args.ascii:
+        vis = maze_visualizer.MazeVisualizer(m, None, delay=args.d, fps=args.fps, ascii=True)
+    else:
+        import tkinter
 
-# generating
-mode = None
-desc = ALGS_LIST[args.a]['name']
-if args.p:
-    mode = args.p
-    desc += " (%s)" % args.p
-vis.set_statusbar('Generating the maze: %s' % ALGS_LIST[args.a]['name'])
+        # create tkinter root
+        tk = tkinter.Tk()
+        tk.title('Maze')
+        tk.geometry('+100+100')
+        tk.lift()
+
+        visualizer = maze_visualizer.RasterVisualizer if args.raster else maze_visualizer.MazeVisualizer
+        vis = visualizer(m, tk, tile_width=args.w, delay=args.d, fps=args.fps)
+
+    vis.draw_maze()
+    vis.set_statusbar('Start delay: %d sec ...' % args.start_delay)
+    time.sleep(args.start_delay)
 
-animate = True if args.animate in [ 'gen','both' ] else False
+# counters are only hooked in with --stats, so plain runs pay nothing
+stats = maze_stats.Stats()
+if args.stats:
+    stats.install()
+    stats.watch_visualizer(vis)
+
+def profile_file(phase):
+    ''' returns the cProfile dump file if the phase is profiled '''
+    if args.profile != phase: return None
+    return args.profile_file or 'maze-%s.prof' % phase
+
+# generating
+generator = None
+if loaded:
+    if args.headless: print('Loaded %dx%d maze from %s' % (m.N, m.N, args.load))
+else:
+    mode = None
+    desc = ALGS_LIST[args.a]['name']
+    if args.p:
+        mode = args.p
+        desc += " (%s)" % args.p
+    vis.set_statusbar('Generating the maze: %s' % ALGS_LIST[args.a]['name'])
 
-try:
-    if   args.a == 0: maze_generators.RecursiveSplit(m,vis,animate=animate,mode=mode)
-    elif args.a == 1: maze_generators.RecursiveBacktracking(m,vis,animate=animate)
-    elif args.a == 2: maze_generators.HuntAndKill(m,vis,animate=animate)
-    elif args.a == 3: maze_generators.Kruskals(m,vis,animate=animate)
-    elif args.a == 4: maze_generators.BinaryTree(m,vis,mode=mode,animate=animate)
-    elif args.a == 5: maze_generators.GrowingTree(m,vis,mode=mode,animate=animate)
-except maze_generators.AlgConfigException as err:
-    print(err)
-    sys.exit(2)
+    animate = True if args.animate in [ 'gen','both' ] and (args.record or not args.headless) else False
 
+    try:
+        with stats.phase('generate', profile=profile_file('generate')):
+            generator = maze_generators.generate(args.a,m,vis,mode=mode,animate=animate,rng=rng)
+    except maze_generators.AlgConfigException as err:
+        print(err)
+        sys.exit(2)
 
+    if args.headless: 
+        print('Generated %dx%d maze using %s in %.3f sec' % (args.n, args.n, desc, stats.timers['generate']))
+    else:
+        vis.set_statusbar('Generated, sleeping 3 sec...')
+        time.sleep(3)
 
-vis.set_statusbar('Generated, sleeping 3 sec...')
-time.sleep(3)
+if args.save:
+    maze_file.save(m, args.save, alg=args.a, params=args.p, seed=args.s)
 
 # solving
 vis.set_statusbar('Solving the maze using %s' % args.solver)
 
-animate = True if args.animate in [ 'sol','both' ] else False
+animate = True if args.animate in [ 'sol','both' ] and (args.record or not args.headless) else False
+
+# the wall follower streams its route to a file instead of keeping it,
+# the solver flushes the route before the file is closed
+with open(args.route, 'w+b') if args.route else contextlib.nullcontext() as route:
+    options = { 'route': route } if route else {}
+
+    with stats.phase('solve', profile=profile_file('solve')):
+        solver = getattr(maze_solver, args.solver)(m,vis,*args.start,*args.finish,animate=animate,
+            rng=solver_rng, **options)
+
+if args.record: vis.close()
+
+if args.stats:
+    stats.uninstall()
+    stats.count('cells expanded', solver.expanded)
+    stats.count('cells visited', solver.visits + (generator.visits if generator else 0))
+
+def report():
+    ''' prints stats and where the profile went, if asked for '''
+    if args.stats: print(stats.report())
 
-if args.solver == 'dfs': maze_solver.dfs(m,vis,*args.start,*args.finish,animate=animate)
-else: maze_solver.bfs(m,vis,*args.start,*args.finish,animate=animate)
+    # loaded mazes have no generate phase
+    if args.profile and not (loaded and args.profile == 'generate'):
+        print('Profile of the %s phase written to %s' % (args.profile, profile_file(args.profile)))
 
-vis.set_statusbar('Solved, close the window to exit.')
-tk.mainloop()
\ No newline at end of file
+if args.headless:
+    print('Solved using %s in %.3f sec, %d cells expanded, path length %d' % 
+        (args.solver, solver.elapsed, solver.expanded, len(solver.path)))
+    report()
+elif args.ascii:
+    vis.set_statusbar('Solved using %s, path length %d' % (args.solver, len(solver.path)))
+    print()
+    report()
+else:
+    report()
+    vis.set_statusbar('Solved, close the window to exit.')
+    tk.mainloop()
@@ -0,0 +1,436 @@
+#!/usr/bin/env python3
+
+'''
+Event logs of maze generation and solving, recorded once at full speed and
+replayed into a visualizer or rendered to image files later.
+
+EventRecorder takes the place of a visualizer: it follows tile states and
+walls and appends every change to the log as it happens. The log is a
+header followed by records, each an opcode byte and a fixed size payload
+(except status text), so it can be read while it is still being written:
+
+    header    magic b'MZEV', version u16, reserved u16, N u64
+    STEP      a redraw request, the unit of animation time
+    WALL      cell u32, side | 0x80 if the wall is closed
+    TILE      cell u32, new tile state u8
+    EXITS     start row, start col, end row, end col, i32 each
+    STATUS    length u16, utf-8 text
+    KEYFRAME  step u64, exits 4 x i32, packed walls (Maze.walls), tile states (N*N bytes)
+
+Keyframes are written at step boundaries every keyframe_events events, so
+EventPlayer can restore the state at any step from the nearest keyframe and
+replay only the records after it. That also lets separate processes render
+separate parts of the animation.
+'''
+
+import maze as mz
+import maze_raster
+import maze_visualizer as mv
+import argparse
+import bisect
+import concurrent.futures
+import mmap
+import os
+import struct
+import sys
+
+MAGIC   = b'MZEV'
+VERSION = 1
+
+HEADER   = struct.Struct('<4sHHQ')
+CELL     = struct.Struct('<IB')
+EXITS    = struct.Struct('<iiii')
+STATUS   = struct.Struct('<H')
+KEYFRAME = struct.Struct('<Qiiii')
+
+OP_STEP     = 0
+OP_WALL     = 1
+OP_TILE     = 2
+OP_EXITS    = 3
+OP_STATUS   = 4
+OP_KEYFRAME = 5
+
+WALL_CLOSED = 0x80
+SIDES = ( mz.NORTH, mz.SOUTH, mz.EAST, mz.WEST )
+
+NO_EXITS = ( -1, -1, -1, -1 )
+
+class EventLogException(Exception):
+    pass
+
+class EventRecorder:
+    '''
+    Visualizer writing an event log to path instead of drawing. Wall
+    changes are picked up when a cell is updated, the way MazeVisualizer
+    sees them.
+    '''
+
+    # generators and solvers report everything, as to a real visualizer
+    headless = False
+
+    def __init__(self, maze, path, keyframe_events=None):
+        N = maze.N
+        if N * N >= 2**32:
+            raise ValueError('Maze too big to record: %dx%d' % (N, N))
+
+        self.maze = maze
+        self.file = open(path, 'wb')
+        self.keyframe_events = keyframe_events or max(4096, N * N)
+
+        # walls and tile states as recorded so far
+        self.shadow = mz.Maze.from_buffer(N, bytearray(maze.walls))
+        self.tile_state = bytearray(N * N)
+        self.exits = NO_EXITS
+
+        self.step = 0
+        self.events = 0
+        self.pending = 0
+
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, N))
+        self.keyframe()
+
+    def keyframe(self):
+        self.file.write(bytes([OP_KEYFRAME]) + KEYFRAME.pack(self.step, *self.exits))
+        self.file.write(self.shadow.walls)
+        self.file.write(self.tile_state)
+        self.events = 0
+
+    def emit(self, op, payload=b''):
+        self.file.write(bytes([op]) + payload)
+        self.events += 1
+        self.pending += 1
+
+    def draw_maze(self):
+        pass
+
+    def mark_exits(self, r1,c1,r2,c2):
+        self.exits = (r1, c1, r2, c2)
+        self.emit(OP_EXITS, EXITS.pack(*self.exits))
+
+        # exits inside the maze are shown as tile states, as MazeVisualizer does
+        N = self.maze.N
+        for r, c, state in ((r1,c1,mv.ST_START), (r2,c2,mv.ST_END)):
+            if 0 < r < N-1 and 0 < c < N-1: self.add_tile_state(r,c,state)
+
+    def update_tk_maze(self, r,c, redraw=False):
+        ''' records walls of the cell that changed since they were last recorded '''
+        cell = r * self.maze.N + c
+
+        for side in SIDES:
+            closed = self.maze.has_wall(r,c,side)
+            if closed != self.shadow.has_wall(r,c,side):
+                self.shadow.wall_bilder(r,c,side,closed)
+                self.emit(OP_WALL, CELL.pack(cell, side | (WALL_CLOSED if closed else 0)))
+
+        if redraw: self.redraw_tk_maze()
+
+    def redraw_tk_maze(self):
+        self.file.write(bytes([OP_STEP]))
+        self.step += 1
+        self.pending = 0
+        if self.events >= self.keyframe_events: self.keyframe()
+
+    def set_statusbar(self, text):
+        text = text.encode('utf-8')[:0xFFFF]
+        self.emit(OP_STATUS, STATUS.pack(len(text)) + text)
+
+    def sleep(self):
+        pass
+
+    def set_tile(self, r,c, state, redraw):
+        cell = r * self.maze.N + c
+        if state != self.tile_state[cell]:
+            self.tile_state[cell] = state
+            self.emit(OP_TILE, CELL.pack(cell, state))
+        self.update_tk_maze(r,c, redraw=redraw)
+
+    def set_tile_state(self, r,c, state, redraw=False):
+        self.set_tile(r,c, state, redraw)
+
+    def add_tile_state(self, r,c, state, redraw=False):
+        self.set_tile(r,c, self.tile_state[r * self.maze.N + c] | state, redraw)
+
+    def clear_tile_state(self, r,c, state, redraw=False):
+        self.set_tile(r,c, self.tile_state[r * self.maze.N + c] & ~state, redraw)
+
+    def close(self):
+        ''' ends the last step and closes the log '''
+        if self.pending: self.redraw_tk_maze()
+        self.file.close()
+
+class EventPlayer:
+    '''
+    Reads an event log. `maze`, `tile_state` and `exits` hold the state
+    at the current position of the log, seek() moves it to any step.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            try:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise EventLogException('Empty event log')
+
+        if len(self.data) < HEADER.size:
+            raise EventLogException('Not an event log: too short')
+        magic, version, _, N = HEADER.unpack_from(self.data)
+        if magic != MAGIC:
+            raise EventLogException('Not an event log: bad magic')
+        if version != VERSION:
+            raise EventLogException('Unsupported event log version %d' % version)
+
+        self.N = N
+        self.walls_size = mz.Maze.walls_size(N)
+        self.keyframe_size = KEYFRAME.size + self.walls_size + N * N
+
+        self.maze = mz.Maze(N)
+        self.tile_state = bytearray(N * N)
+        self.exits = NO_EXITS
+
+        # (step, offset of keyframe payload) in step order, number of steps
+        self.keyframes = []
+        self.steps = 0
+        self.index()
+
+    def records(self, offset=HEADER.size):
+        '''
+        yields (offset after the record, op, payload) from offset on, stops at
+        a truncated record, so logs can be read while they are written
+        '''
+        data, end = self.data, len(self.data)
+
+        while offset < end:
+            op = data[offset]
+            start = offset + 1
+
+            if op == OP_STEP:
+                size, payload = 0, None
+            elif op in (OP_WALL, OP_TILE):
+                size = CELL.size
+                if start + size > end: return
+                payload = CELL.unpack_from(data, start)
+            elif op == OP_EXITS:
+                size = EXITS.size
+                if start + size > end: return
+                payload = EXITS.unpack_from(data, start)
+            elif op == OP_STATUS:
+                if start + STATUS.size > end: return
+                size = STATUS.size + STATUS.unpack_from(data, start)[0]
+                if start + size > end: return
+                payload = bytes(data[start + STATUS.size:start + size]).decode('utf-8', 'replace')
+            elif op == OP_KEYFRAME:
+                size, payload = self.keyframe_size, start
+            else:
+                raise EventLogException('Bad record %d at offset %d' % (op, offset))
+
+            if start + size > end: return
+            offset = start + size
+            yield offset, op, payload
+
+    def index(self):
+        ''' finds keyframes and counts steps '''
+        steps = 0
+        for _, op, payload in self.records():
+            if op == OP_STEP: steps += 1
+            elif op == OP_KEYFRAME: self.keyframes.append((steps, payload))
+        self.steps = steps
+
+        if not self.keyframes:
+            raise EventLogException('Event log has no keyframe')
+
+    def restore(self, offset):
+        ''' sets the state from the keyframe payload at offset '''
+        step, *exits = KEYFRAME.unpack_from(self.data, offset)
+        offset += KEYFRAME.size
+        self.maze.walls[:] = self.data[offset:offset + self.walls_size]
+        offset += self.walls_size
+        self.tile_state[:] = self.data[offset:offset + self.N * self.N]
+        self.exits = tuple(exits)
+        return step
+
+    def apply(self, op, payload):
+        ''' applies a wall or tile record to the state, returns the cell it changed or None '''
+        if op == OP_WALL:
+            cell, side = payload
+            r, c = divmod(cell, self.N)
+            self.maze.wall_bilder(r,c, side & ~WALL_CLOSED, side & WALL_CLOSED != 0)
+            return cell
+        if op == OP_TILE:
+            cell, state = payload
+            self.tile_state[cell] = state
+            return cell
+        if op == OP_EXITS:
+            self.exits = payload
+        return None
+
+    def seek(self, step):
+        ''' sets the state to the given step, returns the offset of the records following it '''
+        step = max(0, min(step, self.steps))
+        k = bisect.bisect_right(self.keyframes, (step, len(self.data))) - 1
+        current = self.restore(self.keyframes[k][1])
+        offset = self.keyframes[k][1] + self.keyframe_size
+
+        if current == step: return offset
+        for offset, op, payload in self.records(offset):
+            if op == OP_STEP:
+                current += 1
+                if current == step: break
+            else:
+                self.apply(op, payload)
+
+        return offset
+
+    def play(self, visualizer, start=0, stop=None):
+        '''
+        replays steps start..stop (the end of the log by default) into a
+        visualizer created over self.maze; the visualizer delay sets the speed
+        '''
+        N = self.N
+        offset = self.seek(start)
+        step = start
+
+        for cell, state in enumerate(self.tile_state):
+            visualizer.set_tile_state(*divmod(cell, N), state)
+        if self.exits != NO_EXITS: visualizer.mark_exits(*self.exits)
+        visualizer.redraw_tk_maze()
+
+        for offset, op, payload in self.records(offset):
+            if op == OP_STEP:
+                step += 1
+                if stop is not None and step >= stop: break
+                visualizer.redraw_tk_maze()
+            elif op == OP_STATUS:
+                visualizer.set_statusbar(payload)
+            elif op == OP_EXITS:
+                self.apply(op, payload)
+                visualizer.mark_exits(*payload)
+            elif op == OP_WALL:
+                visualizer.update_tk_maze(*divmod(self.apply(op, payload), N))
+            elif op == OP_TILE:
+                cell = self.apply(op, payload)
+                visualizer.set_tile_state(*divmod(cell, N), self.tile_state[cell])
+
+    def render_frames(self, pattern, start=0, stop=None, every=1, tile_width=4, wall_width=1):
+        '''
+        writes PPM pictures of steps start..stop which are multiples of
+        every, to pattern % step; needs no display. Returns the number of
+        frames written.
+        '''
+        N = self.N
+        if stop is None: stop = self.steps + 1
+        offset = self.seek(start)
+
+        # a visualizer with no Tk and no terminal only keeps tile states and colors
+        vis = mv.MazeVisualizer(self.maze, None)
+        raster = maze_raster.Raster(N, vis.COLORS, tile_width=tile_width, wall_width=wall_width)
+
+        def set_exits(exits):
+            r1, c1, r2, c2 = exits
+            for r, c, color, state in ((r1,c1,'START',mv.ST_START), (r2,c2,'END',mv.ST_END)):
+                if not raster.mark_exit(r, c, vis.COLORS[color]): vis.tile_state[r][c] |= state
+            return [ r1*N + c1, r2*N + c2 ]
+
+        for cell, state in enumerate(self.tile_state):
+            r, c = divmod(cell, N)
+            vis.tile_state[r][c] = state
+        if self.exits != NO_EXITS: set_exits(self.exits)
+        raster.draw_maze(self.maze, vis.tile_color)
+
+        frames = 0
+        if start % every == 0 and start < stop:
+            raster.save(pattern % start)
+            frames += 1
+
+        # cells changed since the last frame
+        dirty = set()
+        step = start
+        for offset, op, payload in self.records(offset):
+            if op == OP_STEP:
+                step += 1
+                if step >= stop: break
+                if step % every: continue
+
+                for cell in dirty: raster.draw_cell(self.maze, *divmod(cell, N), vis.tile_color)
+                dirty.clear()
+                raster.save(pattern % step)
+                frames += 1
+                continue
+
+            if op == OP_EXITS:
+                self.apply(op, payload)
+                cells = set_exits(payload)
+            else:
+                cell = self.apply(op, payload)
+                if cell is None: continue
+                if op == OP_TILE:
+                    r, c = divmod(cell, N)
+                    vis.tile_state[r][c] = self.tile_state[cell]
+                cells = [ cell ]
+
+            dirty.update(cells)
+
+        return frames
+
+def render_part(path, pattern, start, stop, every, tile_width, wall_width):
+    ''' renders frames of steps start..stop of a log in a worker, returns (start, frames) '''
+    return start, EventPlayer(path).render_frames(pattern, start, stop, every, tile_width, wall_width)
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Replays a maze event log recorded with maze_client.py --record, or renders it to PPM frames.')
+    parser.add_argument('log',                              help="event log file")
+    parser.add_argument('--range',     nargs=2, type=int,   metavar=('start', 'stop'), help="steps to replay, stop excluded")
+    parser.add_argument('-d',          default=0, type=float, help="animation speed in seconds per step")
+    parser.add_argument('-w',          default=10, type=int,  help="tile width in px")
+    parser.add_argument('--raster',    action="store_true",   help="replay into the raster visualizer")
+    parser.add_argument('--ascii',     action="store_true",   help="replay in the terminal")
+    parser.add_argument('--frames',    metavar='DIR',         help="render frames to PPM files in DIR instead of replaying")
+    parser.add_argument('--every',     default=1, type=int,   help="render every n-th step")
+    parser.add_argument('-j',          default=None, type=int,help="number of rendering processes, 0 to render in this process; defaults to CPU count")
+    args = parser.parse_args()
+
+    try:
+        player = EventPlayer(args.log)
+    except (OSError, EventLogException) as err:
+        print('Error: cannot read %s: %s' % (args.log, err), file=sys.stderr)
+        sys.exit(1)
+
+    start, stop = args.range if args.range else (0, player.steps + 1)
+
+    if args.frames:
+        os.makedirs(args.frames, exist_ok=True)
+        pattern = os.path.join(args.frames, 'frame-%08d.ppm')
+
+        # split steps into parts starting at frame steps, each part seeks to its own start
+        workers = (os.cpu_count() or 1) if args.j is None else max(args.j, 1)
+        size = max(args.every, (stop - start + workers - 1) // workers // args.every * args.every)
+        parts = [ (s, min(s + size, stop)) for s in range(start, stop, size) ]
+
+        if args.j == 0:
+            frames = sum(render_part(args.log, pattern, s, e, args.every, args.w, 1)[1] for s, e in parts)
+        else:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [ pool.submit(render_part, args.log, pattern, s, e, args.every, args.w, 1) for s, e in parts ]
+                frames = sum(future.result()[1] for future in futures)
+
+        print('Rendered %d frames of %d steps to %s' % (frames, player.steps, args.frames))
+        sys.exit()
+
+    if args.ascii:
+        vis = mv.MazeVisualizer(player.maze, None, delay=args.d, ascii=True)
+    else:
+        import tkinter
+        tk = tkinter.Tk()
+        tk.title('Maze replay')
+        visualizer = mv.RasterVisualizer if args.raster else mv.MazeVisualizer
+        vis = visualizer(player.maze, tk, tile_width=args.w, delay=args.d)
+
+    vis.draw_maze()
+    player.play(vis, start, stop)
+    vis.set_statusbar('Replayed %d steps' % (min(stop, player.steps + 1) - start))
+
+    if args.ascii: print()
+    else: tk.mainloop()
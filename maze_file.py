@@ -0,0 +1,111 @@
+'''
+Binary maze file format.
+
+    offset  size
+    0       4     magic b'MAZE'
+    4       2     format version
+    6       2     flags, bit 0 set if the seed is known
+    8       4     algorithm number from ALGS_LIST, -1 if unknown
+    12      4     length of the algorithm parameters
+    16      8     seed, unsigned
+    24      8     N
+    32      ...   algorithm parameters, utf-8
+    ...     ...   zero padding to a multiple of 8 bytes
+    ...     ...   packed walls, exactly Maze.walls: N rows of Maze.stride bytes
+
+Seeds from 0 to 2**64-1 are stored, other seeds are saved as unknown
+rather than as a different seed.
+
+load() memory-maps the file and wraps the wall bytes without copying, so
+opening takes the same time whatever the size of the maze.
+'''
+
+import maze as mz
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+MAGIC   = b'MAZE'
+VERSION = 1
+
+FLAG_SEED = 1 << 0
+
+HEADER = struct.Struct('<4sHHiIQQ')
+
+MAX_SEED = (1 << 64) - 1
+
+Header = namedtuple('Header', 'N alg params seed walls_offset')
+
+class MazeFileException(Exception):
+    pass
+
+def walls_offset(params):
+    return (HEADER.size + len(params) + 7) // 8 * 8
+
+def save(maze, path, alg=-1, params=None, seed=None):
+    ''' writes the maze with its generation settings to path '''
+    params = (params or '').encode('utf-8')
+    if seed is not None and not 0 <= seed <= MAX_SEED: seed = None
+    flags = FLAG_SEED if seed is not None else 0
+
+    header = HEADER.pack(MAGIC, VERSION, flags, alg, len(params), seed or 0, maze.N) + params
+    header += bytes(walls_offset(params) - len(header))
+
+    with open(path, 'wb') as f:
+        f.write(header)
+        f.write(maze.walls)
+
+def parse_header(data):
+    ''' returns Header from the beginning of a maze file '''
+    if len(data) < HEADER.size:
+        raise MazeFileException('Not a maze file: too short')
+
+    magic, version, flags, alg, params_len, seed, N = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise MazeFileException('Not a maze file: bad magic')
+    if version != VERSION:
+        raise MazeFileException('Unsupported maze file version %d' % version)
+
+    try:
+        params = bytes(data[HEADER.size:HEADER.size + params_len]).decode('utf-8')
+    except UnicodeDecodeError:
+        raise MazeFileException('Not a maze file: bad parameters') from None
+    offset = walls_offset(params.encode('utf-8'))
+
+    return Header(N, alg, params or None, seed if flags & FLAG_SEED else None, offset)
+
+def read_header(path):
+    ''' reads only the header of a maze file '''
+    with open(path, 'rb') as f:
+        data = f.read(HEADER.size)
+        data += f.read(HEADER.unpack_from(data)[4] if len(data) == HEADER.size else 0)
+    return parse_header(data)
+
+def load(path, writable=False, use_mmap=True):
+    '''
+    Opens a maze file, returns the Maze with its Header in `maze.header`.
+
+    With use_mmap the walls stay in the memory-mapped file and are paged in
+    by the OS as they are queried; writable maps it copy-on-write, so the
+    maze can be changed without changing the file.
+    '''
+    with open(path, 'rb') as f:
+        # empty files cannot be mapped
+        if os.fstat(f.fileno()).st_size < HEADER.size:
+            raise MazeFileException('Not a maze file: too short')
+
+        if use_mmap:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+        else:
+            data = bytearray(f.read())
+
+    header = parse_header(data)
+    size = mz.Maze.walls_size(header.N)
+    if len(data) < header.walls_offset + size:
+        raise MazeFileException('Truncated maze file')
+
+    walls = memoryview(data)[header.walls_offset:header.walls_offset + size]
+    maze = mz.Maze.from_buffer(header.N, walls)
+    maze.header = header
+    return maze
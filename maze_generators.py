@@ -1,7 +1,13 @@
 import maze as mz
 import maze_visualizer as mv
-import random
+import maze_random
 import UF
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 def nbrs_list(size,r,c):
     ''' return a list of neighbour cells in the maze '''
@@ -14,6 +20,27 @@ def nbrs_list(size,r,c):
 
     return nbrs
 
+def nbrs_headings(size,r,c):
+    ''' return a list of headings to neighbour cells, in nbrs_list() order '''
+    headings = []
+
+    if r-1 >= 0:   headings.append(mz.NORTH)
+    if r+1 < size: headings.append(mz.SOUTH)
+    if c-1 >= 0:   headings.append(mz.WEST)
+    if c+1 < size: headings.append(mz.EAST)
+
+    return headings
+
+def pack_headings(headings):
+    ''' 
+    packs up to four headings into an int, 4 bits each; the last heading
+    of the list ends up in the lowest bits, so `h = p & 0xF; p >>= 4` pops 
+    headings in list.pop() order
+    '''
+    p = 0
+    for h in headings: p = (p << 4) | h
+    return p
+
 def heading(r,c,nr,nc):
     ''' returns heading given two pairs of coords in a maze '''
     if nr-r == 1:    return mz.SOUTH
@@ -31,18 +58,30 @@ def to_cell(r,c,h):
 class AlgConfigException(Exception):
     pass
 
+def show_generated(maze, visualizer, animate):
+    ''' shows a maze generated in bulk, row by row '''
+    if visualizer.headless: return
+
+    for r in range(maze.N):
+        for c in range(maze.N):
+            visualizer.set_tile_state(r,c,mv.ST_VISITED)
+        if animate: visualizer.redraw_tk_maze()
+
 class RecursiveSplit:
 
-    def __init__(self, maze, visualizer, animate=False, mode='halves'):
+    def __init__(self, maze, visualizer, animate=False, mode='halves', rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.mode = mode
         self.animate = animate
+        self.rng = maze_random.default(rng)
 
         if mode in ('',None): mode = 'halves'
         if mode not in ('h','halves','r','random'):
             raise AlgConfigException('Invalid algorithm configuration, see alg description parameters')
 
+        # cells walls are drawn along
+        self.visits = 0
         self.split(0,0,maze.N-1,maze.N-1,True)
 
     def split(self,r1,c1,r2,c2,vertical):
@@ -55,8 +94,9 @@ class RecursiveSplit:
         if vertical:
             # pick a column to split at
             if self.mode in ('h','halves'): pos = c1+(c2-c1)//2
-            else: pos = c1 + random.randrange(c2-c1)
+            else: pos = c1 + self.rng.below(c2-c1)
 
+            self.visits += r2-r1+1
             for r in range(r1,r2+1):
                 self.maze.add_wall(r,pos,mz.EAST)
                 self.visualizer.update_tk_maze(r,pos)
@@ -64,7 +104,7 @@ class RecursiveSplit:
             if self.animate: self.visualizer.redraw_tk_maze()
 
             # pick a door at random
-            door = random.randrange(r1,r2+1)
+            door = r1 + self.rng.below(r2-r1+1)
             self.maze.remove_wall(door,pos,mz.EAST)
             self.visualizer.update_tk_maze(door,pos,redraw=self.animate)
             
@@ -75,8 +115,9 @@ class RecursiveSplit:
         else:
             # pick a raw to split at
             if self.mode in ('h','halves'): pos = r1 + (r2-r1)//2
-            else: pos = r1 + random.randrange(r2-r1)
+            else: pos = r1 + self.rng.below(r2-r1)
 
+            self.visits += c2-c1+1
             for c in range(c1,c2+1):
                 self.maze.add_wall(pos,c,mz.SOUTH)
                 self.visualizer.update_tk_maze(pos,c)
@@ -84,7 +125,7 @@ class RecursiveSplit:
             if self.animate: self.visualizer.redraw_tk_maze()
 
             # pick a door at random
-            door = random.randrange(c1,c2+1)
+            door = c1 + self.rng.below(c2-c1+1)
             self.maze.remove_wall(pos,door,mz.SOUTH)
             self.visualizer.update_tk_maze(pos,door,redraw=self.animate)
 
@@ -94,52 +135,89 @@ class RecursiveSplit:
 
 class RecursiveBacktracking:
 
-    def __init__(self, maze, visualizer, animate=False):
+    def __init__(self, maze, visualizer, animate=False, rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.animate = animate
+        self.rng = maze_random.default(rng)
 
-        self.visited = [ [False] * maze.N for _ in range(maze.N) ]
+        self.visited = [ bytearray(maze.N) for _ in range(maze.N) ]
 
+        # cells entered and backtracked to
+        self.visits = 0
         self.carve(0,0)
 
-    def carve(self,r,c):
-        ''' Build a maze using recursive backtracking alg '''
+    def enter(self,r,c):
+        ''' marks a cell visited and returns its stack entry '''
 
         self.visited[r][c] = True
+        self.visits += 1
 
         self.visualizer.add_tile_state(r,c,mv.ST_CURRENT | mv.ST_PATH,redraw=self.animate)
         self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
 
-        nbrs = nbrs_list(self.maze.N, r,c)
-        random.shuffle(nbrs)
+        headings = nbrs_headings(self.maze.N, r,c)
+        self.rng.shuffle(headings)
 
-        while nbrs:
-            nr, nc = nbrs.pop()
-            if self.visited[nr][nc]: continue
-
-            # remove wall
-            self.maze.remove_wall(r,c,heading(r,c,nr,nc))
+        return (r*self.maze.N + c) << 16 | pack_headings(headings)
 
-            # recurse into new cell
-            self.carve(nr, nc)
+    def carve(self,r,c):
+        ''' 
+        Build a maze using recursive backtracking alg
 
-            self.visualizer.add_tile_state(r,c,mv.ST_CURRENT | mv.ST_PATH,redraw=self.animate)             
-            self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
+        The recursion is unrolled into an explicit stack, each entry holds a 
+        cell index and its not yet tried headings (see pack_headings()). 
+        The order of random calls is the same as in the recursive version, 
+        so a seed produces the same maze.
+        '''
 
-        # backtrack
-        self.visualizer.set_tile_state(r,c,mv.ST_VISITED)
+        N = self.maze.N
+        stack = array('q', [ self.enter(r,c) ])
+
+        while stack:
+            entry = stack[-1]
+            r, c = divmod(entry >> 16, N)
+            pending = entry & 0xFFFF
+
+            while pending:
+                h = pending & 0xF
+                pending >>= 4
+
+                nr, nc = to_cell(r,c,h)
+                if self.visited[nr][nc]: continue
+
+                # remove wall and descend into new cell
+                stack[-1] = entry >> 16 << 16 | pending
+                self.maze.remove_wall(r,c,h)
+                stack.append(self.enter(nr,nc))
+                break
+            else:
+                # backtrack
+                stack.pop()
+                self.visualizer.set_tile_state(r,c,mv.ST_VISITED)
+
+                if stack:
+                    r, c = divmod(stack[-1] >> 16, N)
+                    self.visits += 1
+                    self.visualizer.add_tile_state(r,c,mv.ST_CURRENT | mv.ST_PATH,redraw=self.animate)             
+                    self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
 
 class HuntAndKill:
 
-    def __init__(self, maze, visualizer, animate=False):
+    def __init__(self, maze, visualizer, animate=False, rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.animate = animate
+        self.rng = maze_random.default(rng)
         self.scan_line_start = 0
 
-        self.visited = [ [False] * maze.N for _ in range(maze.N) ]
+        self.visited = [ bytearray(maze.N) for _ in range(maze.N) ]
+
+        # number of unvisited cells in each row
+        self.unvisited = array('l', [maze.N]) * maze.N
 
+        # cells walked into, hunted cells are walked from
+        self.visits = 0
         self.process(0,0)
 
     def process(self, r,c):
@@ -153,12 +231,14 @@ class HuntAndKill:
         ''' walk to next unvisited cell '''
         
         self.visited[r][c] = True
+        self.unvisited[r] -= 1
+        self.visits += 1
 
         self.visualizer.add_tile_state(r,c,mv.ST_CURRENT | mv.ST_VISITED,redraw=self.animate)
         self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
 
         nbrs = nbrs_list(self.maze.N, r,c)
-        random.shuffle(nbrs)
+        self.rng.shuffle(nbrs)
 
         while nbrs:
             nr, nc = nbrs.pop()
@@ -175,6 +255,8 @@ class HuntAndKill:
     def vis_scan_line(self, r):
         ''' highlights the scanning row in visualizer '''
 
+        if self.visualizer.headless: return
+
         # set tile state
         for c in range(self.maze.N):
             self.visualizer.add_tile_state(r,c,mv.ST_CORRECT_PATH)
@@ -190,47 +272,61 @@ class HuntAndKill:
         find an unvisited cell adjacent to a visited one;
         remove the wall between two and use unvisited cell 
         as a starting lcation for a walk
+
+        Rows above scan_line_start are fully visited and the visited area
+        is connected and contains (0,0), so the first unvisited cell of the 
+        first row with unvisited cells always borders a visited cell: 
+        the hunt jumps straight to it instead of scanning.
         '''
-        for r in range(self.scan_line_start,self.maze.N):
-            self.vis_scan_line(r)
-            for c in range(self.maze.N):
-                if not self.visited[r][c]:
-                    nbrs = nbrs_list(self.maze.N, r,c)
-                    random.shuffle(nbrs)
 
-                    while nbrs:
-                        nr, nc = nbrs.pop()
-                        if not self.visited[nr][nc]: continue
+        # skip rows with no unvisited cells
+        while self.scan_line_start < self.maze.N and self.unvisited[self.scan_line_start] == 0:
+            self.vis_scan_line(self.scan_line_start)
+            self.scan_line_start += 1
 
-                        # carve wall and return
-                        self.maze.remove_wall(r,c, heading(r,c,nr,nc))
+        if self.scan_line_start == self.maze.N:
+            # no unvisited tiles
+            return 0,0,True
 
-                        return r,c,False
+        r = self.scan_line_start
+        c = self.visited[r].find(0)
+        self.vis_scan_line(r)
 
-            # this row has no unvisited cells, so
-            # skip re-scanning it
-            self.scan_line_start += 1
+        nbrs = nbrs_list(self.maze.N, r,c)
+        self.rng.shuffle(nbrs)
+
+        while nbrs:
+            nr, nc = nbrs.pop()
+            if not self.visited[nr][nc]: continue
+
+            # carve wall and return
+            self.maze.remove_wall(r,c, heading(r,c,nr,nc))
 
-        # no unvisited tiles
-        return 0,0,True
+            return r,c,False
 
 class BinaryTree:
 
-    def __init__(self, maze, visualizer, mode='SE', animate=False):
+    def __init__(self, maze, visualizer, mode='SE', animate=False, rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.animate = animate
+        self.rng = maze_random.default(rng)
         self.mode = mode.upper() if mode is not None else 'SE'
 
         if self.mode not in ('NW','NE','SW','SE'):
             raise AlgConfigException('Invalid algorithm configuration, see alg description parameters')
 
+        self.visits = 0
         self.generate(0,0)
 
     def generate(self, r,c):
         ''' Generates a maze '''
 
         for r in range(self.maze.N):
+            # with bulk draws one coin per cell picks one of two headings
+            flips = self.rng.coin_flips(self.maze.N) if self.rng.bulk else None
+            self.visits += self.maze.N
+
             for c in range(self.maze.N):
                 
                 headings = []
@@ -246,15 +342,318 @@ class BinaryTree:
                 else: # 'SE'
                     if r < self.maze.N-1: headings.append(mz.SOUTH)                
                     if c < self.maze.N-1: headings.append(mz.EAST)
-                random.shuffle(headings)
 
                 if headings:
-                    h = headings.pop()
+                    if flips is None:
+                        self.rng.shuffle(headings)
+                        h = headings.pop()
+                    else:
+                        h = headings[-1] if flips[c] == '1' else headings[0]
                     self.maze.remove_wall(r,c,h)
                 
                 self.visualizer.add_tile_state(r,c,mv.ST_VISITED | mv.ST_CURRENT, redraw=self.animate)
                 self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
                 
+class VectorizedBinaryTree:
+    '''
+    Binary tree algorithm computed on the whole wall grid with NumPy.
+
+    Every cell independently carves one of the two headings of the mode, 
+    so all choices are drawn at once and applied as array operations. 
+    Random bits come from a NumPy generator seeded from rng, so mazes are 
+    repeatable but differ from BinaryTree for the same seed.
+    '''
+
+    def __init__(self, maze, visualizer, mode='SE', animate=False, rng=None):
+        self.maze = maze
+        self.visualizer = visualizer
+        self.animate = animate
+        self.rng = maze_random.default(rng)
+        self.mode = mode.upper() if mode is not None else 'SE'
+
+        if self.mode not in ('NW','NE','SW','SE'):
+            raise AlgConfigException('Invalid algorithm configuration, see alg description parameters')
+        if np is None:
+            raise AlgConfigException('Vectorized binary tree requires numpy')
+
+        self.visits = maze.N ** 2
+        self.generate()
+        show_generated(self.maze, self.visualizer, self.animate)
+
+    def generate(self):
+        N = self.maze.N
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+
+        rows = np.arange(N)[:,None]
+        cols = np.arange(N)[None,:]
+        can_v = rows > 0   if self.mode[0] == 'N' else rows < N-1
+        can_h = cols > 0   if self.mode[1] == 'W' else cols < N-1
+
+        # carve vertically where it is the only option or the coin says so
+        coin = rng.integers(0, 2, size=(N,N), dtype=np.uint8).astype(bool)
+        go_v = can_v & (coin | ~can_h)
+        go_h = can_h & ~go_v
+
+        open_south = np.zeros((N,N), dtype=bool)
+        open_east  = np.zeros((N,N), dtype=bool)
+        if self.mode[0] == 'N': open_south[:-1] = go_v[1:]
+        else:                   open_south = go_v
+        if self.mode[1] == 'W': open_east[:,:-1] = go_h[:,1:]
+        else:                   open_east = go_h
+
+        codes = np.full((N,N), mz.CELL_SOUTH | mz.CELL_EAST, dtype=np.uint8)
+        codes[open_south] &= mz.CELL_EAST
+        codes[open_east]  &= mz.CELL_SOUTH
+        self.maze.set_codes(codes)
+
+class Sidewinder:
+    '''
+    Sidewinder algorithm, vectorized over all rows with NumPy.
+
+    The top row is a single corridor. In every other row cells are grouped 
+    into runs: each cell either extends the run by carving east or closes 
+    it, and a closed run carves north from one of its cells picked at random.
+    The last cell of a row always closes the run, so flattening the grid 
+    row by row keeps runs inside their rows and all runs are found at once.
+    '''
+
+    def __init__(self, maze, visualizer, animate=False, rng=None):
+        self.maze = maze
+        self.visualizer = visualizer
+        self.animate = animate
+        self.rng = maze_random.default(rng)
+
+        if np is None:
+            raise AlgConfigException('Sidewinder requires numpy')
+
+        self.visits = maze.N ** 2
+        self.generate()
+        show_generated(self.maze, self.visualizer, self.animate)
+
+    def generate(self):
+        N = self.maze.N
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+
+        codes = np.full((N,N), mz.CELL_SOUTH | mz.CELL_EAST, dtype=np.uint8)
+
+        # top row is one corridor
+        codes[0,:-1] &= mz.CELL_SOUTH
+
+        if N > 1:
+            close = rng.integers(0, 2, size=(N-1,N), dtype=np.uint8).astype(bool)
+            close[:,-1] = True
+
+            # carve east inside runs
+            codes[1:][~close] &= mz.CELL_SOUTH
+
+            # runs end at closing cells, each carves north from a random member
+            ends = np.flatnonzero(close)
+            starts = np.concatenate(([0], ends[:-1] + 1))
+            picks = starts + (rng.random(len(ends)) * (ends - starts + 1)).astype(np.int64)
+
+            # carving north from a cell in row r+1 opens the south wall of row r
+            above = codes[:-1].reshape(-1)
+            above[picks] &= mz.CELL_EAST
+            codes[:-1] = above.reshape(N-1, N)
+
+        self.maze.set_codes(codes)
+
+def eller_rows(width, height=None, rng=None):
+    '''
+    Eller's algorithm, yields a maze row by row as bytes of cell codes 
+    (maze.CELL_SOUTH | maze.CELL_EAST bits), keeping only the set of 
+    each cell of the current row, so memory is O(width).
+
+    With height=None the maze never ends, the caller takes as many rows as 
+    it needs. Otherwise the last row joins all remaining sets and the 
+    result is a perfect width x height maze.
+    '''
+    rng = maze_random.default(rng)
+
+    # set label of each cell in the current row, always < width
+    labels = list(range(width))
+    r = 0
+
+    while height is None or r < height:
+        last = height is not None and r == height-1
+        codes = bytearray([mz.CELL_SOUTH | mz.CELL_EAST]) * width
+
+        # join adjacent cells of different sets at random, a fresh 
+        # union-find over labels keeps the row linear
+        parent = list(range(width))
+        def find(p):
+            while p != parent[p]:
+                parent[p] = parent[parent[p]]
+                p = parent[p]
+            return p
+
+        bits = rng.getrandbits(width) if width > 1 else 0
+        for c in range(width-1):
+            a, b = find(labels[c]), find(labels[c+1])
+            if a != b and (last or bits >> c & 1):
+                codes[c] &= ~mz.CELL_EAST
+                parent[b] = a
+
+        labels = [ find(label) for label in labels ]
+
+        if not last:
+            # every set carves at least one passage south; cells carving 
+            # south pass their set on, others start new sets
+            members = {}
+            for c, label in enumerate(labels): members.setdefault(label, []).append(c)
+
+            bits = rng.getrandbits(width)
+            down = bytearray(width)
+            for cols in members.values():
+                picked = [ c for c in cols if bits >> c & 1 ]
+                if not picked: picked = [ rng.choice(cols) ]
+                for c in picked:
+                    down[c] = 1
+                    codes[c] &= ~mz.CELL_SOUTH
+
+            # relabel: cells carving south keep their set, unused labels 
+            # go to cells starting a new set
+            free = iter(sorted(set(range(width)) - set(labels[c] for c in range(width) if down[c])))
+            labels = [ labels[c] if down[c] else next(free) for c in range(width) ]
+
+        yield bytes(codes)
+        r += 1
+
+class Eller:
+    '''
+    Eller's algorithm filling a maze row by row, see eller_rows()
+    '''
+
+    def __init__(self, maze, visualizer, animate=False, rng=None):
+        self.maze = maze
+        self.visualizer = visualizer
+        self.animate = animate
+        self.rng = maze_random.default(rng)
+        self.visits = 0
+
+        for r, codes in enumerate(eller_rows(maze.N, maze.N, self.rng)):
+            maze.set_row(r, codes)
+            self.visits += maze.N
+
+            if visualizer.headless: continue
+            for c in range(maze.N):
+                visualizer.set_tile_state(r,c,mv.ST_VISITED)
+            if animate: visualizer.redraw_tk_maze()
+
+class Frontier:
+    '''
+    Indexed bag of cell ids for GrowingTree, membership, adding and removing
+    any cell are O(1).
+
+    An ordered frontier keeps cells in insertion order: oldest and newest 
+    picks are amortized O(1), picking the k-th cell (random and middle 
+    picks) is O(log n) using a Fenwick tree over live insertion slots. 
+    An unordered frontier keeps cells in a plain array with swap-remove, 
+    so a random pick is O(1) as well, but there is no oldest/newest order.
+    '''
+
+    def __init__(self, capacity, ordered=True):
+        self.ordered = ordered
+        self.size = 0
+
+        # slot of each cell in self.cells, -1 if not in the frontier
+        typecode = 'i' if capacity < 2**31 else 'q'
+        self.slot = array(typecode, [-1]) * capacity
+        self.cells = array(typecode)
+
+        if ordered:
+            # Fenwick tree of live slots and the first slot which may be live
+            self.tree = array(typecode, [0]) * (capacity + 1)
+            self.top = 1 << capacity.bit_length()
+            self.head = 0
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, cell):
+        return self.slot[cell] >= 0
+
+    def add(self, cell):
+        if self.ordered and len(self.cells) == len(self.slot): self.compact()
+
+        i = len(self.cells)
+        self.slot[cell] = i
+        self.cells.append(cell)
+        self.size += 1
+
+        if self.ordered:
+            self.head = min(self.head, i)
+            self.update(i, 1)
+
+    def remove(self, cell):
+        i = self.slot[cell]
+        self.slot[cell] = -1
+        self.size -= 1
+
+        if self.ordered:
+            # leave a hole, dead slots are skipped by picks
+            self.update(i, -1)
+        else:
+            # swap-remove
+            last = self.cells.pop()
+            if last != cell:
+                self.cells[i] = last
+                self.slot[last] = i
+
+    def compact(self):
+        ''' drops dead slots once re-added cells used up all of them '''
+        self.cells = array(self.cells.typecode, [ cell for i, cell in enumerate(self.cells) if self.live(i) ])
+        self.head = 0
+
+        tree = self.tree
+        for i in range(len(tree)): tree[i] = 0
+        for i, cell in enumerate(self.cells):
+            self.slot[cell] = i
+            tree[i+1] = 1
+
+        # linear Fenwick build, every node passes its sum on to its parent
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree): tree[j] += tree[i]
+
+    def live(self, i):
+        return self.slot[self.cells[i]] == i
+
+    def oldest(self):
+        if not self.ordered: return self.cells[0]
+        while not self.live(self.head): self.head += 1
+        return self.cells[self.head]
+
+    def newest(self):
+        if self.ordered:
+            # dead slots at the end are dropped and reused by later adds
+            while not self.live(len(self.cells)-1): self.cells.pop()
+        return self.cells[-1]
+
+    def kth(self, k):
+        ''' returns the k-th cell, counting from 0 in insertion order '''
+        if not self.ordered: return self.cells[k]
+
+        tree, i, step = self.tree, 0, self.top
+        while step:
+            if i + step < len(tree) and tree[i + step] <= k:
+                i += step
+                k -= tree[i]
+            step >>= 1
+        return self.cells[i]
+
+    def choice(self, rng):
+        ''' returns a random cell drawn with rng '''
+        return self.kth(rng.below(self.size))
+
+    def update(self, i, delta):
+        ''' adds delta to the Fenwick tree at slot i '''
+        tree = self.tree
+        i += 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
 class GrowingTree:
     '''
     Growing tree algorithm
@@ -264,6 +663,11 @@ class GrowingTree:
        that cell, adding that neighbor to C as well. 
        If there are no unvisited neighbors, remove the cell from C.
     3. Repeat #2 until C is empty.
+
+    C is an indexed Frontier. Policy 'u' (unordered) picks a random cell like 
+    'r' does, but lets C drop insertion order and swap-remove cells, so it is 
+    O(1) per step; it only takes effect when it is the only policy, mixed 
+    with other policies it behaves as 'r'.
     '''
 
     def canon_strategy(self, strategy) -> str:
@@ -271,12 +675,14 @@ class GrowingTree:
         if strategy.lower() in ('o','old','oldest'):  return 'o'
         if strategy.lower() in ('n','new','newest'):  return 'n'
         if strategy.lower() in ('m','mid','middle'):  return 'm'
+        if strategy.lower() in ('u','unordered'):     return 'u'
         raise ValueError
 
-    def __init__(self, maze, visualizer, mode='r', animate=False):
+    def __init__(self, maze, visualizer, mode='r', animate=False, rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.animate = animate
+        self.rng = maze_random.default(rng)
 
         # mode processing
         # creates a list with dicts of strategy->weight pairs
@@ -299,50 +705,57 @@ class GrowingTree:
             self.mode = [ { 'name': 'r', 'weight': 1 } ]
         # /mode processing
 
-        self.visited = [ [False] * maze.N for _ in range(maze.N) ]
+        self.visited = [ bytearray(maze.N) for _ in range(maze.N) ]
 
         # start at a random position
-        r, c = random.randrange(maze.N),random.randrange(maze.N)
-        self.frontier = [ (r,c) ]
+        r, c = self.rng.below(maze.N),self.rng.below(maze.N)
+        ordered = any(m['name'] != 'u' for m in self.mode)
+        self.frontier = Frontier(maze.N ** 2, ordered=ordered)
+        self.frontier.add(r*maze.N + c)
         self.visited[r][c] = True
 
         self.visualizer.set_tile_state(r,c, mv.ST_PATH | mv.ST_VISITED, redraw=self.animate)
         
+        # cells picked from the frontier
+        self.visits = 0
         self.grow()
 
     def pick_cell(self):
         ''' picks a cell according to specified mode '''
 
-        w = random.randrange(self.total_weight)
+        w = self.rng.below(self.total_weight)
         for m in self.mode:
             if w < m['weight']:
-                if m['name'] == "r": return random.choice(self.frontier)
-                if m['name'] == "n": return self.frontier[-1]
-                if m['name'] == "o": return self.frontier[0]
-                if m['name'] == "m": return self.frontier[len(self.frontier)//2]
+                if m['name'] in "ru": return self.frontier.choice(self.rng)
+                if m['name'] == "n": return self.frontier.newest()
+                if m['name'] == "o": return self.frontier.oldest()
+                if m['name'] == "m": return self.frontier.kth(len(self.frontier)//2)
 
     def grow(self):
+        N = self.maze.N
 
         while self.frontier:
-            r, c = self.pick_cell()
+            cell = self.pick_cell()
+            r, c = divmod(cell, N)
+            self.visits += 1
 
             # get unvisited neighbours
-            nbrs = [ (nr,nc) for nr,nc in nbrs_list(self.maze.N,r,c) if not self.visited[nr][nc] ]
+            nbrs = [ (nr,nc) for nr,nc in nbrs_list(N,r,c) if not self.visited[nr][nc] ]
 
             if not nbrs:
-                self.frontier.remove((r,c))
+                self.frontier.remove(cell)
 
                 self.visualizer.clear_tile_state(r,c, mv.ST_PATH, redraw=self.animate)
                 continue
 
-            nr, nc = random.choice(nbrs)
+            nr, nc = self.rng.choice(nbrs)
             self.maze.remove_wall(r,c,heading(r,c,nr,nc))
             self.visited[nr][nc] = True
             
             self.visualizer.set_tile_state(nr,nc, mv.ST_PATH | mv.ST_VISITED, redraw=self.animate)
 
-            if (nr,nc) not in self.frontier:
-                self.frontier.append((nr,nc))
+            if nr*N + nc not in self.frontier:
+                self.frontier.add(nr*N + nc)
 
 
 class Kruskals:
@@ -352,22 +765,74 @@ class Kruskals:
     3. If the edge connects two disjoint trees, join the trees. Otherwise, 
        throw that edge away.
     4. Repeat until there are no more edges left.
+
+    Edges are encoded as ints, cell_id*2 for the east wall of a cell and 
+    cell_id*2+1 for its south wall, and kept in a flat array. The default
+    mode shuffles them with rng, 'fast' mode uses a NumPy 
+    permutation instead, which is much quicker for large mazes but gives 
+    different mazes for the same seed.
+
+    Unless the generation is animated, edges are joined in batches with 
+    NumPy when it is installed, see process_batched(); the maze is the same
+    as the one process() builds edge by edge. On one core N=4096 then takes
+    about 8 sec in 'fast' mode and 21 sec in the default mode, which is
+    mostly the shuffle. Without NumPy the Python loop over edges takes
+    about 3.5 sec at N=1024 and a minute at N=4096.
     '''
 
-    def __init__(self, maze, visualizer, animate=False):
+    def __init__(self, maze, visualizer, animate=False, mode=None, rng=None):
         self.maze = maze
         self.visualizer = visualizer
         self.animate = animate
+        self.rng = maze_random.default(rng)
+        self.mode = mode.lower() if mode not in ('',None) else 'default'
 
-        self.edges = []
-        self.UF = UF.UF(maze.N ** 2)
-        for r in range(maze.N):
-            for c in range(maze.N):
-                if c < maze.N-1: self.edges.append((r,c,mz.EAST))
-                if r < maze.N-1: self.edges.append((r,c,mz.SOUTH))
+        if self.mode not in ('default','fast'):
+            raise AlgConfigException('Invalid algorithm configuration, see alg description parameters')
+        if self.mode == 'fast' and np is None:
+            raise AlgConfigException("Kruskal's fast mode requires numpy")
+
+        self.edges = self.edge_ids(maze.N)
+
+        if self.mode == 'fast':
+            rng = np.random.default_rng(self.rng.getrandbits(64))
+            edges = rng.permutation(np.frombuffer(self.edges, dtype='i%d' % self.edges.itemsize))
+            self.edges = array(self.edges.typecode)
+            self.edges.frombytes(edges.view(np.uint8))
+            del edges
+        else:
+            self.rng.shuffle(self.edges)
+
+        # both cells of every edge examined
+        self.visits = 0
+        if np is not None and not animate: self.process_batched()
+        else: self.process()
 
-        random.shuffle(self.edges)
-        self.process()
+    def edge_ids(self, N):
+        ''' 
+        returns an array of all inner wall ids, in row by row order with
+        the east wall of a cell followed by its south wall 
+        '''
+        edges = array('i' if 2 * N * N < 2**31 else 'q')
+
+        if np is not None:
+            # all ids but the east walls of the last column and the south
+            # walls of the last row
+            inner = np.ones((N, 2*N), dtype=bool)
+            inner[:, 2*N-2] = False
+            inner[N-1, 1::2] = False
+            ids = np.arange(2*N*N, dtype='i%d' % edges.itemsize).reshape(N, 2*N)
+            edges.frombytes(ids[inner].view(np.uint8))
+            return edges
+
+        for r in range(N):
+            base = 2 * r * N
+            if r < N-1:
+                edges.extend(range(base, base + 2*N - 2))
+                edges.append(base + 2*N - 1)
+            else:
+                edges.extend(range(base, base + 2*N - 2, 2))
+        return edges
 
     def eid(self,r,c):
         ''' calculate element id for UF '''
@@ -375,19 +840,240 @@ class Kruskals:
 
     def process(self):
         cnt = 0
+        N = self.maze.N
+        self.UF = UF.UF(N ** 2)
 
-        while self.edges:
-            r, c, h = self.edges.pop()
-            nr, nc = to_cell(r,c,h)
+        # edges are pulled from the end of the bag
+        for e in reversed(self.edges):
+            # all cells joined, remaining edges would be thrown away
+            if self.UF.count == 1: break
 
-            if self.UF.connected(self.eid(r,c),self.eid(nr,nc)): continue
+            self.visits += 2
+            p = e >> 1
+            q = p + N if e & 1 else p + 1
+            if not self.UF.union(p, q): continue
+
+            r, c = divmod(p, N)
+            nr, nc = divmod(q, N)
 
             self.visualizer.set_tile_state(r,c,mv.ST_VISITED)
-            self.UF.union(self.eid(r,c),self.eid(nr,nc))
-            self.maze.remove_wall(r,c, heading(r,c,nr,nc))
+            self.maze.remove_wall(r,c, mz.SOUTH if e & 1 else mz.EAST)
 
             # redraw only every third update
             cnt += 1
             redraw = True if cnt % 3 == 0 and self.animate else False
             self.visualizer.set_tile_state(nr,nc,mv.ST_VISITED,redraw=redraw)
 
+    def process_batched(self):
+        '''
+        Borůvka's algorithm on the edges weighted by the order process()
+        pulls them in. All weights differ, so the spanning tree is unique
+        and the same one Kruskal's algorithm finds. Every round each tree
+        joins along its lightest edge to another tree, at least halving the
+        number of trees, and a round is a few array operations.
+
+        Trees are numbered 0..trees-1 and edges carry the numbers of the
+        trees at their ends, renumbered every round, so rounds get cheaper
+        as trees merge.
+        '''
+        N = self.maze.N
+
+        # edges lightest first, with the trees of their two cells
+        edges = np.frombuffer(self.edges, dtype='i%d' % self.edges.itemsize)[::-1]
+        tp = edges >> 1
+        tq = tp + 1 + (edges & 1) * (N-1)
+        trees = N*N
+
+        while trees > 1:
+            # drop edges inside a tree, they would close a loop
+            outer = tp != tq
+            if not outer.all(): edges, tp, tq = edges[outer], tp[outer], tq[outer]
+            del outer
+            self.visits += 2 * len(edges)
+
+            # lightest edge of every tree, by position in the sorted edges
+            lightest = np.full(trees, len(edges), dtype=edges.dtype)
+            at = np.arange(len(edges), dtype=edges.dtype)
+            np.minimum.at(lightest, tp, at)
+            np.minimum.at(lightest, tq, at)
+            del at
+
+            # carve the picked edges, two trees may pick the same one
+            carve = np.zeros(len(edges), dtype=bool)
+            carve[lightest] = True
+            carved = edges[carve]
+            del carve
+            south = carved & 1 == 1
+            self.maze.remove_walls(carved[south] >> 1, mz.CELL_SOUTH)
+            self.maze.remove_walls(carved[~south] >> 1, mz.CELL_EAST)
+
+            # point every tree at the tree across its edge, the lower one of
+            # two trees picking each other points at itself, then follow
+            # pointers to the root
+            tree = np.arange(trees, dtype=edges.dtype)
+            target = np.where(tp[lightest] == tree, tq[lightest], tp[lightest])
+            mutual = (target[target] == tree) & (tree < target)
+            target[mutual] = tree[mutual]
+            while True:
+                jumped = target[target]
+                if np.array_equal(jumped, target): break
+                target = jumped
+
+            # number the merged trees by their roots
+            roots = target == tree
+            number = (np.cumsum(roots, dtype=edges.dtype) - 1)[target]
+            tp = number[tp]
+            tq = number[tq]
+            trees = int(roots.sum())
+
+        show_generated(self.maze, self.visualizer, self.animate)
+
+class Wilson:
+    '''
+    Wilson's algorithm, a uniform spanning tree: every perfect maze is
+    equally likely, so mazes have none of the textures other algorithms
+    leave.
+
+    The tree starts with one cell. A random walk from a cell outside the
+    tree runs until it hits the tree, and the walk with its loops erased
+    joins the tree. Loops are erased in place: each cell only keeps the
+    heading the walk last left it by, and following headings from the
+    start of the walk gives the path without loops.
+
+    'aldous-broder' mode builds the whole tree with one Aldous-Broder walk
+    instead, which adds every cell it enters for the first time. It is
+    uniform too, and fast while most cells are new, but slows down a lot
+    hunting the last ones. Switching from it to Wilson's walks part way is
+    not uniform: where the walk stands when it stops skews the rest of the
+    tree, and 8x8 mazes get noticeably more dead ends.
+
+    Cells are flat indices of a grid with a border of sentinel cells, so
+    walks need no bounds checks. Headings are drawn in bulk, and walls are
+    collected as cell codes and written to the maze row by row.
+    '''
+
+    # cell states
+    FREE, TREE, BORDER = 0, 1, 2
+
+    def __init__(self, maze, visualizer, mode='wilson', animate=False, rng=None):
+        self.maze = maze
+        self.visualizer = visualizer
+        self.animate = animate
+        self.rng = maze_random.default(rng)
+        self.mode = mode.lower() if mode not in ('',None) else 'wilson'
+
+        if self.mode not in ('wilson','aldous-broder'):
+            raise AlgConfigException('Invalid algorithm configuration, see alg description parameters')
+
+        N = maze.N
+        W = N+1
+
+        # rows 0 and N+1 and column N are the border, cell (r,c) is (r+1)*W + c
+        self.state = bytearray([ self.FREE ]) * ((N+2) * W)
+        self.state[:W] = self.state[-W:] = bytes([ self.BORDER ]) * W
+        self.state[2*W-1:(N+1)*W:W] = bytes([ self.BORDER ]) * N
+
+        self.codes = bytearray([ mz.CELL_SOUTH | mz.CELL_EAST ]) * len(self.state)
+
+        # moves, and the code of the wall crossed by each one: its offset
+        # from the cell left and the bits it keeps
+        self.moves = (-W, W, -1, 1)
+        self.wall_at = (-W, 0, -1, 0)
+        self.keep = (mz.CELL_EAST, mz.CELL_EAST, mz.CELL_SOUTH, mz.CELL_SOUTH)
+        self.headings = self.rng.small_ints(2)
+
+        root = (self.rng.below(N) + 1) * W + self.rng.below(N)
+        self.state[root] = self.TREE
+
+        # cells walked into, with the start cells of walks
+        self.visits = 1
+        if self.mode == 'aldous-broder': self.aldous_broder(root)
+        else: self.wilson()
+
+        for r in range(N):
+            maze.set_row(r, self.codes[(r+1)*W:(r+1)*W + N])
+        show_generated(maze, visualizer, animate)
+
+    def aldous_broder(self, i):
+        ''' walks at random from tree cell i until all cells are in the tree '''
+        state, codes, moves, wall_at, keep = self.state, self.codes, self.moves, self.wall_at, self.keep
+        FREE, BORDER = self.FREE, self.BORDER
+        target = self.maze.N ** 2
+        count = 1
+        bumps = 0
+
+        for drawn, h in enumerate(self.headings):
+            if count >= target: break
+
+            j = i + moves[h]
+            s = state[j]
+            if s == BORDER:
+                bumps += 1
+                continue
+
+            if s == FREE:
+                state[j] = self.TREE
+                codes[i + wall_at[h]] &= keep[h]
+                count += 1
+            i = j
+
+        # every heading drawn and used is a step, unless it hit the border
+        self.visits += drawn - bumps
+
+    def wilson(self):
+        ''' adds loop-erased walks from every cell outside the tree, in row order '''
+        state, codes, moves, wall_at, keep = self.state, self.codes, self.moves, self.wall_at, self.keep
+        headings = self.headings
+        FREE, BORDER = self.FREE, self.BORDER
+
+        # heading each cell of the current walk was last left by
+        exits = bytearray(len(state))
+        steps = 0
+
+        for start in range(len(state)):
+            if state[start] != FREE: continue
+
+            i = start
+            steps += 1
+            while state[i] == FREE:
+                h = next(headings)
+                j = i + moves[h]
+                if state[j] == BORDER: continue
+                exits[i] = h
+                i = j
+                steps += 1
+
+            # retrace the walk along last exits, skipping its loops
+            i = start
+            while state[i] == FREE:
+                state[i] = self.TREE
+                h = exits[i]
+                codes[i + wall_at[h]] &= keep[h]
+                i += moves[h]
+
+        self.visits += steps
+
+# algorithms by number, as used on the command line
+ALGS_LIST = [
+    { 'name': 'Recursive split', 'param': [ 'halves', 'random' ], 'walls': False, 'cls': RecursiveSplit },
+    { 'name': 'Recursive backtracking', 'param':  None, 'walls': True, 'cls': RecursiveBacktracking },
+    { 'name': 'Hunt-and-kill',   'param':  None, 'walls': True, 'cls': HuntAndKill },
+    { 'name': "Kruskal's",       'param': [ 'default', 'fast' ], 'walls': True, 'cls': Kruskals },
+    { 'name': 'Binary tree',     'param': [ 'NE','NW','SE','SW'], 'walls': True, 'cls': BinaryTree },
+    { 'name': 'Growing tree',    'param': [ '<policy:weight>[,<policy:weight>...]'], 'walls': True, 'cls': GrowingTree },
+    { 'name': 'Sidewinder (NumPy)',  'param':  None, 'walls': True, 'cls': Sidewinder },
+    { 'name': 'Binary tree (NumPy)', 'param': [ 'NE','NW','SE','SW'], 'walls': True, 'cls': VectorizedBinaryTree },
+    { 'name': "Eller's",         'param':  None, 'walls': True, 'cls': Eller },
+    { 'name': "Wilson's",        'param': [ 'wilson', 'aldous-broder' ], 'walls': True, 'cls': Wilson }
+]
+
+def generate(alg, maze, visualizer, mode=None, animate=False, rng=None):
+    ''' 
+    runs algorithm number alg from ALGS_LIST on the maze, which should be 
+    created with the walls setting of the algorithm; mode is ignored by 
+    algorithms without parameters. Random numbers are drawn from rng, a 
+    maze_random.MazeRandom, by default one seeded from the random module.
+    '''
+    desc = ALGS_LIST[alg]
+    if desc['param'] is None: return desc['cls'](maze, visualizer, animate=animate, rng=rng)
+    return desc['cls'](maze, visualizer, mode=mode, animate=animate, rng=rng)
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+'''
+Parallel generation of one giant maze.
+
+The maze is split into square blocks, and a process pool generates each one
+as an independent perfect maze with any ALGS_LIST algorithm, drawing from
+the (block row, block column) stream of the maze seed. The blocks are then
+joined into one perfect maze the way Kruskal's algorithm joins cells: block
+borders are shuffled, and a border gets a single passage at a random
+position only if union-find shows that it joins two separate regions.
+Every stream comes from the maze seed, so the maze is the same whatever
+the number of workers is.
+
+Blocks are copied into the maze as packed bytes, so block sizes have to be
+a multiple of CELLS_PER_BYTE.
+'''
+
+import maze as mz
+import maze_file
+import maze_generators
+import maze_random
+import maze_visualizer
+import UF
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+from maze_generators import ALGS_LIST
+
+# largest block size picked by default_block()
+MAX_BLOCK = 512
+
+# sets south walls of all cells of a packed byte
+SET_SOUTH = bytes(b | sum(mz.CELL_SOUTH << i*mz.CELL_BITS for i in range(mz.CELLS_PER_BYTE)) for b in range(256))
+
+# hash salts
+SALT_BLOCK = 1
+SALT_JOIN  = 2
+
+def default_block(N):
+    ''' returns the largest block size up to MAX_BLOCK N can be split into, or None '''
+    for block in range(min(N, MAX_BLOCK) // mz.CELLS_PER_BYTE * mz.CELLS_PER_BYTE, 0, -mz.CELLS_PER_BYTE):
+        if N % block == 0: return block
+    return None
+
+def build_block(alg, mode, block, seed, br, bc):
+    ''' generates block (br,bc), returns its packed walls '''
+    m = mz.Maze(N=block, walls=ALGS_LIST[alg]['walls'])
+    rng = maze_random.MazeRandom(seed, SALT_BLOCK, br, bc)
+    maze_generators.generate(alg, m, maze_visualizer.NullVisualizer(m), mode=mode, rng=rng)
+    return bytes(m.walls)
+
+def place_block(m, walls, block, br, bc):
+    ''' copies packed walls of block (br,bc) into the maze, closing its borders '''
+    width = block // mz.CELLS_PER_BYTE
+    last_east = mz.CELL_EAST << (mz.CELLS_PER_BYTE - 1) * mz.CELL_BITS
+
+    # walls=False algorithms leave border bits clear, borders are closed here
+    for lr in range(block):
+        row = bytearray(walls[lr*width:(lr+1)*width])
+        row[-1] |= last_east
+        if lr == block-1: row = row.translate(SET_SOUTH)
+
+        i = (br*block + lr) * m.stride + bc*width
+        m.walls[i:i + width] = row
+
+def join_blocks(m, block, seed):
+    '''
+    opens one passage on borders between blocks joining separate regions,
+    returns the number of passages opened
+    '''
+    blocks = m.N // block
+    rng = maze_random.MazeRandom(seed, SALT_JOIN)
+
+    # borders as ints, block_id*2 for the east border of a block and block_id*2+1 for its south one
+    borders = [ b*2 + side for b in range(blocks*blocks) for side in (0, 1)
+                if (side == 0 and b % blocks < blocks-1) or (side == 1 and b // blocks < blocks-1) ]
+    rng.shuffle(borders)
+
+    uf = UF.UF(blocks*blocks)
+    opened = 0
+    for e in borders:
+        if uf.count == 1: break
+
+        p = e >> 1
+        q = p + blocks if e & 1 else p + 1
+        if not uf.union(p, q): continue
+
+        br, bc = divmod(p, blocks)
+        offset = rng.randrange(block)
+        if e & 1: m.remove_wall(br*block + block-1, bc*block + offset, mz.SOUTH)
+        else:     m.remove_wall(br*block + offset, bc*block + block-1, mz.EAST)
+        opened += 1
+
+    return opened
+
+def generate(N, block=None, seed=0, alg=1, mode=None, workers=None):
+    '''
+    returns an NxN perfect maze made of block x block mazes generated by
+    workers processes, 0 to generate them in this process
+    '''
+    if block is None: block = default_block(N)
+    if not block or N % block or block % mz.CELLS_PER_BYTE:
+        raise ValueError('Maze size %d cannot be split into blocks of a multiple of %d cells' % (N, mz.CELLS_PER_BYTE))
+
+    m = mz.Maze(N=N)
+    blocks = N // block
+    cells = [ divmod(b, blocks) for b in range(blocks*blocks) ]
+    args = lambda br, bc: (alg, mode, block, seed, br, bc)
+
+    if workers == 0:
+        for br, bc in cells: place_block(m, build_block(*args(br, bc)), block, br, bc)
+    else:
+        if workers is None: workers = os.cpu_count() or 1
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = { pool.submit(build_block, *args(br, bc)): (br, bc) for br, bc in cells }
+            for future in concurrent.futures.as_completed(futures):
+                place_block(m, future.result(), block, *futures[future])
+
+    join_blocks(m, block, seed)
+    return m
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Generates one NxN maze as blocks built in parallel and joined into a perfect maze.')
+    parser.add_argument('-n',          default=1024, type=int, help="maze size")
+    parser.add_argument('-a',          default=1, type=int,   help="block generation algorithm, see maze_client.py --algs")
+    parser.add_argument('-p',          type=str,              help="algorithm parameters")
+    parser.add_argument('-s',          default=0, type=int,   help="random seed")
+    parser.add_argument('--block',     default=None, type=int,help="block size, a divisor of N and a multiple of %d; defaults to the largest one up to %d" % (mz.CELLS_PER_BYTE, MAX_BLOCK))
+    parser.add_argument('-j',          default=None, type=int,help="number of worker processes, 0 to run in this process; defaults to CPU count")
+    parser.add_argument('-o',          default=None, metavar='FILE', help="save the maze to a file")
+    args = parser.parse_args()
+
+    if args.a not in range(len(ALGS_LIST)):
+        print('Error: unknown algorithm %d' % args.a, file=sys.stderr)
+        sys.exit(1)
+
+    # fail early on a bad configuration rather than in every worker
+    try:
+        maze_generators.generate(args.a, mz.Maze(N=1), maze_visualizer.NullVisualizer(), mode=args.p)
+    except maze_generators.AlgConfigException as err:
+        print(err)
+        sys.exit(2)
+
+    started = time.perf_counter()
+    try:
+        m = generate(args.n, block=args.block, seed=args.s, alg=args.a, mode=args.p, workers=args.j)
+    except ValueError as err:
+        print('Error: %s' % err, file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    print('%dx%d maze of %s blocks in %.2f sec, %.0f cells/sec' %
+        (args.n, args.n, ALGS_LIST[args.a]['name'], elapsed, args.n ** 2 / elapsed if elapsed else 0))
+
+    if args.o:
+        params = 'parallel a=%d block=%d' % (args.a, args.block or default_block(args.n))
+        if args.p: params += ' p=%s' % args.p
+        maze_file.save(m, args.o, params=params, seed=args.s)
@@ -0,0 +1,113 @@
+'''
+Random numbers for generators and solvers.
+
+Every generator and solver draws from its own MazeRandom, so runs do not
+depend on each other or on the global random module. MazeRandom is a
+random.Random and by default draws exactly what the random module would,
+so seeds keep giving the mazes they gave when generators called
+random.shuffle() and friends. MazeRandom(seed, bulk=True) draws in bulk
+where Python call overhead would dominate: short lists are shuffled with
+permutations picked in batches, and rows of coin flips come from a single
+call. Bulk draws are faster but give different mazes for the same seed.
+
+Seeds: MazeRandom(seed) is seeded with the integer seed itself. This is
+what `-s` of maze_client.py means, and maze_batch.py, maze_bench.py and
+maze_server.py use it the same way, so a seed gives the same maze
+everywhere. Independent streams of a seed, e.g. one per parallel worker or
+one for the solver, are MazeRandom(seed, *stream), seeded with a splitmix64
+hash of the seed and the stream ints. Mersenne Twister has no cheap jump
+ahead, so streams are separate generators with unrelated seeds.
+'''
+
+import itertools
+import operator
+import os
+import random
+
+MASK64 = (1 << 64) - 1
+
+def mix(*values):
+    ''' splitmix64 hash of a few ints, stable across runs and platforms '''
+    h = 0
+    for v in values:
+        h = (h + (v & MASK64) + 0x9E3779B97F4A7C15) & MASK64
+        h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+        h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & MASK64
+        h ^= h >> 31
+    return h
+
+# permutations drawn at once for short shuffles
+BATCH = 256
+
+# all orders of lists of 2 to 4 items, neighbours and headings of a cell,
+# as getters returning the items of a list in that order
+ORDERS = [ None, None ] + [ [ operator.itemgetter(*p) for p in itertools.permutations(range(n)) ] for n in range(2, 5) ]
+
+# streams of maze_client.py runs
+STREAM_SOLVER = 1
+
+class MazeRandom(random.Random):
+    '''
+    random.Random with bulk draws and independent streams; seed is an int,
+    None picks one from os.urandom().
+
+    With bulk, shuffle() of lists up to 4 items picks one of the orders
+    drawn in batches of BATCH by choices(), and callers may use
+    coin_flips(), which draws a whole row of coins with one getrandbits()
+    call, in place of shuffles of two items. Otherwise shuffle() is
+    random.shuffle(). small_ints() streams random bytes cut down to a few
+    bits and below(n) is randrange(n) with only the n > 0 check, both in
+    either mode.
+    '''
+
+    def __init__(self, seed=None, *stream, bulk=False):
+        if seed is None: seed = int.from_bytes(os.urandom(8), 'little')
+
+        self.base_seed = seed
+        self.stream = stream
+        self.bulk = bulk
+        self.orders = [ [] for _ in ORDERS ]
+        super().__init__(mix(seed, *stream) if stream else seed)
+
+    def spawn(self, *stream):
+        ''' returns an independent generator for a sub-stream of this one '''
+        return MazeRandom(self.base_seed, *self.stream, *stream, bulk=self.bulk)
+
+    def below(self, n):
+        ''' returns a random int in [0, n), drawing bit_length(n) bits until one is below n '''
+        if n <= 0: raise ValueError('below() needs n > 0, got %r' % (n,))
+
+        k = n.bit_length()
+        r = self.getrandbits(k)
+        while r >= n: r = self.getrandbits(k)
+        return r
+
+    def coin_flips(self, n):
+        ''' returns a string of n random '0' and '1' characters '''
+        return format(self.getrandbits(n), '0%db' % n) if n else ''
+
+    def small_ints(self, k):
+        ''' returns an endless iterator of random k-bit ints, k <= 8, drawn BATCH bytes at a time '''
+        low = bytes(range(1 << k)) * (256 >> k)
+        return itertools.chain.from_iterable(iter(lambda: self.randbytes(BATCH).translate(low), None))
+
+    def shuffle(self, x):
+        ''' shuffles a mutable sequence in place, with bulk short ones with a single pre-drawn order '''
+        n = len(x)
+        if not self.bulk or n >= len(ORDERS): return super().shuffle(x)
+        if n < 2: return
+
+        orders = self.orders[n]
+        if not orders: orders.extend(self.choices(ORDERS[n], k=BATCH))
+        items = orders.pop()(x)
+
+        if type(x) is list: x[:] = items
+        else:
+            for i in range(n): x[i] = items[i]
+
+def default(rng):
+    '''
+    returns rng, or a MazeRandom seeded from the global random module for
+    callers which do not pass one
+    '''
+    return rng if rng is not None else MazeRandom(random.getrandbits(64))
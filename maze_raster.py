@@ -0,0 +1,212 @@
+'''
+Maze pictures drawn into an RGB pixel buffer.
+
+Raster knows nothing about Tk: cells are painted by writing bytes into a
+bytearray, and any rectangle of it can be exported as binary PPM, which Tk
+PhotoImage reads directly and image tools can convert. Drawing a whole maze
+takes time proportional to its pixel count.
+
+Each cell is a tile_width square of tile pixels surrounded by wall_width
+strips. Strips between cells are shared, as are the wall_width squares at
+their corners, so a maze is N * (tile_width + wall_width) + wall_width
+pixels wide. An open wall or corner takes the tile color if all cells 
+around it have the same one, the background color otherwise, so the 
+picture only depends on the maze and tile colors, not on the drawing order.
+'''
+
+import maze as mz
+
+# X11 values of the color names used by MazeVisualizer.COLORS
+RGB = {
+    'white':      (255, 255, 255),
+    'black':      (0, 0, 0),
+    'navy':       (0, 0, 128),
+    'red':        (255, 0, 0),
+    'green':      (0, 255, 0),
+    'linen':      (250, 240, 230),
+    'hot pink':   (255, 105, 180),
+    'pink':       (255, 192, 203),
+    'lightgreen': (144, 238, 144),
+    'lightgray':  (211, 211, 211),
+}
+
+def rgb(color):
+    ''' returns (r,g,b) of a '#rrggbb' color or a name from RGB '''
+    if color.startswith('#') and len(color) == 7:
+        return tuple(int(color[i:i+2], 16) for i in (1, 3, 5))
+    try:
+        return RGB[color.lower()]
+    except KeyError:
+        raise ValueError('Unknown color %r' % color)
+
+class Raster:
+
+    def __init__(self, N, colors, tile_width=10, wall_width=1, resolve=rgb):
+        '''
+        colors is a MazeVisualizer.COLORS like table, resolve maps a color
+        to (r,g,b) and is used for names missing from RGB
+        '''
+        self.N = N
+        self.tile_width = tile_width
+        self.wall_width = wall_width
+        self.pitch = tile_width + wall_width
+        self.size = N * self.pitch + wall_width
+        self.resolve = resolve
+        self.cache = {}
+
+        self.pixels = bytearray(self.size * self.size * 3)
+
+        self.wall = self.color(colors['WALL'])
+        self.border = self.color(colors['BORDER'])
+        self.open = self.color(colors['BACKGROUND'])
+
+        # border strips of exit cells, (r,c) -> (side, color)
+        self.marks = {}
+
+    def color(self, color):
+        ''' returns pixel bytes of a color '''
+        pixel = self.cache.get(color)
+        if pixel is None:
+            pixel = self.cache[color] = bytes(self.resolve(color))
+        return pixel
+
+    def fill_rect(self, x, y, w, h, pixel):
+        row = pixel * w
+        stride = self.size * 3
+        i = (y * self.size + x) * 3
+        for _ in range(h):
+            self.pixels[i:i + 3*w] = row
+            i += stride
+
+    def mark_exit(self, r, c, color):
+        '''
+        colors the border strip next to an exit cell, returns False if the 
+        cell is not on the border; the cell has to be drawn again to show it
+        '''
+        N = self.N
+        if r == 0:      side = mz.NORTH
+        elif r == N-1:  side = mz.SOUTH
+        elif c == 0:    side = mz.WEST
+        elif c == N-1:  side = mz.EAST
+        else: return False
+
+        self.marks[(r, c)] = (side, color)
+        return True
+
+    def corner(self, maze, i, j, pixels):
+        '''
+        returns the pixel of the corner at the top-left of cell (i,j), given 
+        pixels of the four cells around it: the wall color if any wall 
+        meeting there is closed
+        '''
+        N = self.N
+        if i in (0, N) or j in (0, N): return self.border
+        if (maze.has_wall(i-1, j-1, mz.EAST) or maze.has_wall(i, j-1, mz.EAST) or
+            maze.has_wall(i-1, j-1, mz.SOUTH) or maze.has_wall(i-1, j, mz.SOUTH)):
+            return self.wall
+        return pixels[0] if pixels.count(pixels[0]) == 4 else self.open
+
+    def between(self, a, b):
+        ''' returns the pixel of an open wall between cells of pixels a and b '''
+        return a if a == b else self.open
+
+    def draw_cell(self, maze, r, c, color_of):
+        ''' 
+        paints cell (r,c) with its walls and corners, color_of(r,c) returns 
+        tile colors; walls and corners also depend on the neighbours' colors
+        '''
+        N, t, w = self.N, self.tile_width, self.wall_width
+        x = c * self.pitch + w
+        y = r * self.pitch + w
+
+        # pixels of the cell and its eight neighbours, None outside the maze
+        around = [ [ self.color(color_of(i, j)) if 0 <= i < N and 0 <= j < N else None
+                     for j in (c-1, c, c+1) ] for i in (r-1, r, r+1) ]
+        pixel = around[1][1]
+
+        self.fill_rect(x, y, t, t, pixel)
+
+        sides = (
+            (mz.NORTH, r == 0,   x,   y-w, t, w, around[0][1]),
+            (mz.SOUTH, r == N-1, x,   y+t, t, w, around[2][1]),
+            (mz.WEST,  c == 0,   x-w, y,   w, t, around[1][0]),
+            (mz.EAST,  c == N-1, x+t, y,   w, t, around[1][2]),
+        )
+        mark = self.marks.get((r, c))
+        for side, outer, sx, sy, sw, sh, other in sides:
+            if outer:
+                strip = self.color(mark[1]) if mark and mark[0] == side else self.border
+            else:
+                strip = self.wall if maze.has_wall(r, c, side) else self.between(pixel, other)
+            self.fill_rect(sx, sy, sw, sh, strip)
+
+        for di, dj, cx, cy in ((0, 0, x-w, y-w), (0, 1, x+t, y-w), (1, 0, x-w, y+t), (1, 1, x+t, y+t)):
+            pixels = [ around[di][dj], around[di][dj+1], around[di+1][dj], around[di+1][dj+1] ]
+            self.fill_rect(cx, cy, w, w, self.corner(maze, r+di, c+dj, pixels))
+
+    def draw_maze(self, maze, color_of):
+        '''
+        paints all cells, color_of(r,c) returns the tile color; the picture
+        is the same as drawing every cell with draw_cell(), but it is built 
+        a band of scanlines at a time
+        '''
+        N, t, w = self.N, self.tile_width, self.wall_width
+        stride = self.size * 3
+        has_wall, border, wall = maze.has_wall, self.border, self.wall
+
+        above = None
+        for i in range(N+1):
+            pixels = [ self.color(color_of(i, j)) for j in range(N) ] if i < N else None
+
+            # wall line above row i: corners and north walls
+            line = []
+            for j in range(N+1):
+                if 0 < i < N and 0 < j < N:
+                    corner = self.corner(maze, i, j, [ above[j-1], above[j], pixels[j-1], pixels[j] ])
+                else:
+                    corner = border
+                line.append(corner * w)
+                if j == N: break
+                if i in (0, N): strip = border
+                else: strip = wall if has_wall(i, j, mz.NORTH) else self.between(above[j], pixels[j])
+                line.append(strip * t)
+
+            y = i * self.pitch
+            self.pixels[y*stride:(y+w)*stride] = b''.join(line) * w
+            if i == N: break
+
+            # tiles of row i with west walls
+            line = []
+            for j in range(N+1):
+                if j in (0, N): strip = border
+                else: strip = wall if has_wall(i, j, mz.WEST) else self.between(pixels[j-1], pixels[j])
+                line.append(strip * w)
+                if j < N: line.append(pixels[j] * t)
+
+            y += w
+            self.pixels[y*stride:(y+t)*stride] = b''.join(line) * t
+            above = pixels
+
+        for r, c in self.marks: self.draw_cell(maze, r, c, color_of)
+
+    def cell_box(self, r, c):
+        ''' returns (x, y, w, h) of the pixels draw_cell() paints '''
+        return c * self.pitch, r * self.pitch, self.pitch + self.wall_width, self.pitch + self.wall_width
+
+    def ppm(self, x=0, y=0, w=None, h=None):
+        ''' returns a rectangle of the picture, the whole one by default, as binary PPM '''
+        if w is None: w = self.size - x
+        if h is None: h = self.size - y
+
+        header = b'P6\n%d %d\n255\n' % (w, h)
+        if (x, y, w, h) == (0, 0, self.size, self.size):
+            return header + bytes(self.pixels)
+
+        stride = self.size * 3
+        i = (y * self.size + x) * 3
+        return header + b''.join(self.pixels[i + k*stride:i + k*stride + 3*w] for k in range(h))
+
+    def save(self, path):
+        ''' writes the picture to a PPM file '''
+        with open(path, 'wb') as f:
+            f.write(self.ppm())
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+
+'''
+Maze query server.
+
+Answers generate and solve requests over TCP, one JSON object per line in
+each direction. A maze is keyed by (algorithm, parameters, seed, N). It is
+loaded from a directory of maze files written by maze_batch.py when the
+file is there, and generated otherwise. Mazes and their TreeIndex are kept
+in an LRU cache limited by memory. Generation and indexing run in a
+process pool, and paths are walked and encoded in a thread, so the event
+loop only parses requests and answers index lookups. Requests for a maze
+that is still being built wait for the same build. An index that does
+not fit the cache budget answers the requests waiting for it and is
+dropped.
+
+Requests and responses; an "id" given in a request is copied to its response:
+
+    {"op": "generate", "alg": 1, "params": null, "seed": 7, "n": 32}
+    -> {"ok": true, "n": 32, "stride": 8, "walls": "<base64 of Maze.walls>"}
+
+    {"op": "solve", "alg": 1, "seed": 7, "n": 32, "start": [0, 0], "finish": [31, 31]}
+    -> {"ok": true, "distance": 94, "path": [[0, 0], [0, 1], ...]}
+
+    {"op": "stats"}
+    -> {"ok": true, "mazes": 3, "bytes": 81920, "hits": 10, "misses": 3, ...}
+
+"params" and "seed" are optional, seed defaults to 0. Solve requests with
+"path": false only get the distance. Errors are answered with
+{"ok": false, "error": "..."}.
+'''
+
+import maze
+import maze_batch
+import maze_file
+import maze_generators
+import maze_random
+import maze_tree
+import maze_visualizer
+import argparse
+import asyncio
+import base64
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+from collections import OrderedDict
+from maze_generators import ALGS_LIST
+
+MAX_N = 2000
+
+class RequestError(Exception):
+    pass
+
+# --- jobs run in worker processes
+
+def build_maze(alg, params, seed, N, mazes_dir=None):
+    ''' returns packed walls of a maze, read from mazes_dir if maze_batch.py saved it there '''
+    if mazes_dir:
+        path = maze_batch.maze_path(mazes_dir, alg, N, seed)
+        if os.path.exists(path):
+            m = maze_file.load(path, use_mmap=False)
+            if (m.header.params, m.header.seed) == (params, seed): return bytes(m.walls)
+
+    m = maze.Maze(N=N, walls=ALGS_LIST[alg]['walls'])
+    maze_generators.generate(alg, m, maze_visualizer.NullVisualizer(m), mode=params, rng=maze_random.MazeRandom(seed))
+    return bytes(m.walls)
+
+def build_index(N, walls):
+    return maze_tree.TreeIndex(maze.Maze.from_buffer(N, bytearray(walls)))
+
+def index_bytes(N):
+    ''' returns the least memory a TreeIndex of an NxN maze takes, its parent and depth arrays '''
+    return 2 * N*N * (4 if N*N < 2**31 else 8)
+
+def encode(response):
+    return json.dumps(response).encode('utf-8') + b'\n'
+
+# --- cache
+
+class Entry:
+    ''' a cached maze and its index, which is built by the first solve request '''
+
+    def __init__(self, maze):
+        self.maze = maze
+        self.index = None
+
+    def size(self):
+        ''' returns the number of bytes held by the maze and its index '''
+        size = len(self.maze.walls)
+        if self.index is not None:
+            for table in [ self.index.depth ] + self.index.up:
+                size += table.itemsize * len(table)
+        return size
+
+class MazeCache:
+    ''' LRU cache of entries by key, at most cache_bytes are kept '''
+
+    def __init__(self, cache_bytes):
+        self.cache_bytes = cache_bytes
+        self.entries = OrderedDict()
+        self.sizes = {}
+        self.cached_bytes = 0
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        ''' adds an entry or updates the size of a cached one, evicting least recently used entries '''
+        if key in self.entries:
+            self.cached_bytes -= self.sizes[key]
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self.sizes[key] = entry.size()
+        self.cached_bytes += self.sizes[key]
+
+        # always keep the newest entry
+        while self.cached_bytes > self.cache_bytes and len(self.entries) > 1:
+            old, _ = self.entries.popitem(last=False)
+            self.cached_bytes -= self.sizes.pop(old)
+            self.evictions += 1
+
+# --- server
+
+class MazeServer:
+
+    def __init__(self, cache_bytes=256 << 20, workers=None, mazes_dir=None, max_n=MAX_N):
+        self.cache = MazeCache(cache_bytes)
+        self.mazes_dir = mazes_dir
+        self.max_n = max_n
+
+        # no process pool with 0 workers, jobs run in a thread, handy for debugging;
+        # workers are spawned, forked ones would keep copies of client sockets open
+        if workers == 0: self.pool = concurrent.futures.ThreadPoolExecutor(1)
+        else: self.pool = concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+
+        # paths are walked in the cached index, which stays in this process
+        self.walker = concurrent.futures.ThreadPoolExecutor(1)
+
+        # builds in progress by (kind, key)
+        self.building = {}
+
+        self.ops = { 'generate': self.generate, 'solve': self.solve, 'stats': self.stats }
+
+    def close(self):
+        self.pool.shutdown(cancel_futures=True)
+        self.walker.shutdown(cancel_futures=True)
+
+    async def run_job(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+
+    async def run_walk(self, fn, *args):
+        ''' runs fn in the walker thread, long paths would stall the event loop '''
+        return await asyncio.get_running_loop().run_in_executor(self.walker, fn, *args)
+
+    async def shared(self, job, make):
+        ''' awaits the coroutine make() started by the first caller of job, later callers wait for the same result '''
+        task = self.building.get(job)
+        if task is None:
+            task = self.building[job] = asyncio.ensure_future(make())
+            task.add_done_callback(lambda _: self.building.pop(job, None))
+
+        # a client going away does not cancel a build others may wait for
+        return await asyncio.shield(task)
+
+    async def get_entry(self, key):
+        entry = self.cache.get(key)
+        if entry is not None: return entry
+
+        async def make():
+            walls = await self.run_job(build_maze, *key, self.mazes_dir)
+            entry = Entry(maze.Maze.from_buffer(key[3], bytearray(walls)))
+            self.cache.put(key, entry)
+            return entry
+
+        return await self.shared(('maze', key), make)
+
+    async def get_index(self, key):
+        entry = await self.get_entry(key)
+        if entry.index is not None: return entry.index
+
+        if len(entry.maze.walls) + index_bytes(entry.maze.N) > self.cache.cache_bytes:
+            raise RequestError('Maze is too big to index within the cache budget')
+
+        async def make():
+            index = await self.run_job(build_index, entry.maze.N, bytes(entry.maze.walls))
+
+            # lifting tables may take the entry over budget, then the index is not kept
+            entry.index = index
+            if entry.size() > self.cache.cache_bytes: entry.index = None
+            elif key in self.cache.entries: self.cache.put(key, entry)
+            return index
+
+        return await self.shared(('index', key), make)
+
+    def maze_key(self, request):
+        ''' returns (alg, params, seed, N) of a request '''
+        alg, params, seed, N = (request.get(name) for name in ('alg', 'params', 'seed', 'n'))
+        if seed is None: seed = 0
+
+        if type(alg) is not int or alg not in range(len(ALGS_LIST)):
+            raise RequestError('Unknown algorithm %r' % (alg,))
+        if params is not None and not isinstance(params, str):
+            raise RequestError('Algorithm parameters must be a string')
+        if type(seed) is not int:
+            raise RequestError('Seed must be an integer')
+        if type(N) is not int or not 1 <= N <= self.max_n:
+            raise RequestError('Maze size must be an integer from 1 to %d' % self.max_n)
+
+        return alg, params, seed, N
+
+    def cell(self, request, name, N):
+        cell = request.get(name)
+        if (not isinstance(cell, list) or len(cell) != 2 or
+            any(type(x) is not int or not 0 <= x < N for x in cell)):
+            raise RequestError('%s must be [row, col] inside the maze' % name.capitalize())
+        return cell
+
+    async def generate(self, request):
+        entry = await self.get_entry(self.maze_key(request))
+        m = entry.maze
+        return { 'n': m.N, 'stride': m.stride, 'walls': base64.b64encode(m.walls).decode('ascii') }
+
+    async def solve(self, request):
+        key = self.maze_key(request)
+        start = self.cell(request, 'start', key[3])
+        finish = self.cell(request, 'finish', key[3])
+
+        index = await self.get_index(key)
+        response = { 'distance': index.distance(*start, *finish) }
+        if request.get('path', True): response['path'] = await self.run_walk(index.path, *start, *finish)
+        return response
+
+    async def stats(self, request):
+        cache = self.cache
+        return {
+            'mazes': len(cache.entries), 'bytes': cache.cached_bytes, 'budget': cache.cache_bytes,
+            'hits': cache.hits, 'misses': cache.misses, 'evictions': cache.evictions,
+            'building': len(self.building)
+        }
+
+    async def respond(self, line):
+        ''' returns the encoded response to a request line '''
+        request = {}
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                request = {}
+                raise RequestError('Request must be a JSON object')
+
+            op = self.ops.get(request.get('op'))
+            if op is None:
+                raise RequestError('Unknown op %r, use one of %s' % (request.get('op'), ', '.join(self.ops)))
+
+            response = { 'ok': True }
+            response.update(await op(request))
+        except (RequestError, maze_generators.AlgConfigException, maze_file.MazeFileException, ValueError) as err:
+            response = { 'ok': False, 'error': str(err) }
+        except Exception as err:
+            print('Error: %r in response to %r' % (err, line), file=sys.stderr)
+            response = { 'ok': False, 'error': 'Internal error: %s' % err }
+
+        if 'id' in request: response['id'] = request['id']
+        if 'path' in response: return await self.run_walk(encode, response)
+        return encode(response)
+
+    async def handle(self, reader, writer):
+        ''' answers requests of a connection in order '''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                if not line.strip(): continue
+
+                writer.write(await self.respond(line))
+                await writer.drain()
+        except (ConnectionError, ValueError):
+            # connection lost, or a request line over the stream limit
+            pass
+        finally:
+            writer.close()
+
+async def serve(server, host, port):
+    listener = await asyncio.start_server(server.handle, host, port)
+    for sock in listener.sockets:
+        print('Serving mazes on %s:%d' % sock.getsockname()[:2])
+
+    async with listener:
+        await listener.serve_forever()
+
+# --- main
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(
+        description='Serves maze generate and solve requests as line-delimited JSON over TCP.')
+    parser.add_argument('--host',      default='127.0.0.1',  help="address to listen on")
+    parser.add_argument('--port',      default=8765, type=int,help="port to listen on")
+    parser.add_argument('--cache_mb',  default=256, type=int, help="memory budget of cached mazes and indexes in MB")
+    parser.add_argument('-j',          default=None, type=int,help="number of worker processes, 0 to run jobs in a thread; defaults to CPU count")
+    parser.add_argument('--mazes',     default=None, metavar='DIR', help="directory of maze_batch.py files to load mazes from")
+    parser.add_argument('--max_n',     default=MAX_N, type=int, help="largest maze size served")
+    args = parser.parse_args()
+
+    server = MazeServer(cache_bytes=args.cache_mb << 20, workers=args.j, mazes_dir=args.mazes, max_n=args.max_n)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
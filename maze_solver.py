@@ -1,11 +1,20 @@
 
 import maze as mz
 import maze_visualizer as mv
-import random
+import maze_random
+import time
+import heapq
+import tempfile
+from array import array
+from collections import deque
+
+# row and column offsets for headings
+DR = { mz.NORTH: -1, mz.SOUTH: 1, mz.EAST: 0, mz.WEST: 0 }
+DC = { mz.NORTH: 0, mz.SOUTH: 0, mz.EAST: 1, mz.WEST: -1 }
 
 class dfs:
 
-    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False):
+    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False, rng=None):
         self.maze       = maze
         self.visualizer = visualizer
         self.start_row  = start_row
@@ -13,14 +22,20 @@ class dfs:
         self.end_row    = end_row
         self.end_col    = end_col
         self.animate    = animate
+        self.rng        = maze_random.default(rng)
 
         self.solved = False
-        self.visited = [ [False] * maze.N for _ in range(maze.N) ]
+        self.visited = [ bytearray(maze.N) for _ in range(maze.N) ]
+        self.expanded = 0
+        self.visits = 0
+        self.path = []
 
         # mark start and finish positions for the solver
         self.visualizer.mark_exits(start_row, start_col,end_row, end_col)
 
+        started = time.perf_counter()
         self.maze_solver(start_row, start_col)
+        self.elapsed = time.perf_counter() - started
 
     def connected_nbrs(self,r,c):
         ''' return a list of connected nieghbour cells in the maze '''
@@ -33,12 +48,23 @@ class dfs:
 
         return nbrs
 
-    def maze_solver(self, r,c):
-        ''' Just a DFS implementation with visualizer updates '''
+    def connected_headings(self,r,c):
+        ''' return a list of headings to connected cells, in connected_nbrs() order '''
+        headings = []
+
+        if r-1 >= 0          and not self.maze.has_wall(r,c,mz.NORTH): headings.append(mz.NORTH)
+        if r+1 < self.maze.N and not self.maze.has_wall(r,c,mz.SOUTH): headings.append(mz.SOUTH)
+        if c-1 >= 0          and not self.maze.has_wall(r,c,mz.WEST): headings.append(mz.WEST)
+        if c+1 < self.maze.N and not self.maze.has_wall(r,c,mz.EAST): headings.append(mz.EAST)
 
-        if self.solved == True: return
+        return headings
+
+    def enter(self,r,c):
+        ''' marks a cell visited and returns its stack entry, sets self.solved at the exit '''
 
         self.visited[r][c] = True
+        self.expanded += 1
+        self.visits += 1
 
         self.visualizer.add_tile_state(r,c,
             mv.ST_CURRENT | mv.ST_CORRECT_PATH,
@@ -47,28 +73,62 @@ class dfs:
 
         if (r,c) == (self.end_row, self.end_col):
             self.solved = True
-            return
+            return (r*self.maze.N + c) << 16
+
+        headings = self.connected_headings(r,c)
+        self.rng.shuffle(headings)
+
+        pending = 0
+        for h in headings: pending = (pending << 4) | h
 
-        nbrs = self.connected_nbrs(r,c)
-        random.shuffle(nbrs)
+        return (r*self.maze.N + c) << 16 | pending
 
-        while nbrs:
-            nr, nc = nbrs.pop()
-            if not self.visited[nr][nc]:
-                self.maze_solver(nr, nc)
+    def maze_solver(self, r,c):
+        ''' 
+        Just a DFS implementation with visualizer updates 
+
+        Uses an explicit stack of cell indices with not yet tried headings
+        packed in the low 16 bits, 4 bits per heading. Random draws happen in
+        the same order as in a recursive DFS.
+        '''
+
+        N = self.maze.N
+        stack = array('q', [ self.enter(r,c) ])
+
+        while stack and not self.solved:
+            entry = stack[-1]
+            r, c = divmod(entry >> 16, N)
+            pending = entry & 0xFFFF
 
-                if not self.solved: # don't update the visualization once solved
+            while pending:
+                h = pending & 0xF
+                pending >>= 4
+
+                nr, nc = r + DR[h], c + DC[h]
+                if self.visited[nr][nc]: continue
+
+                stack[-1] = entry >> 16 << 16 | pending
+                stack.append(self.enter(nr,nc))
+                break
+            else:
+                # dead end, backtrack
+                stack.pop()
+                self.visualizer.set_tile_state(r,c,mv.ST_DEADEND)
+
+                if stack:
+                    r, c = divmod(stack[-1] >> 16, N)
+                    self.visits += 1
                     self.visualizer.add_tile_state(r,c,
                         mv.ST_CURRENT | mv.ST_CORRECT_PATH,
                         redraw=self.animate)
                     self.visualizer.clear_tile_state(r,c,mv.ST_CURRENT)
 
-        if not self.solved: # don't backtrack the correct path
-            self.visualizer.set_tile_state(r,c,mv.ST_DEADEND)
+        # cells left on the stack are the path
+        if self.solved: self.path = [ divmod(entry >> 16, N) for entry in stack ]
 
 class bfs:
 
-    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False):
+    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False, rng=None):
         self.maze       = maze
         self.visualizer = visualizer
         self.start_row  = start_row
@@ -90,7 +150,13 @@ class bfs:
         # just using DEADEND color to mark visited tiles
         self.visualizer.add_tile_state(start_row,start_col,mv.ST_DEADEND)
 
+        self.expanded = 0
+        self.visits = 1
+        self.path = []
+
+        started = time.perf_counter()
         self.maze_solver()
+        self.elapsed = time.perf_counter() - started
 
     def connected_nbrs(self,r,c):
         ''' return a list of connected nieghbour cells in the maze '''
@@ -108,6 +174,7 @@ class bfs:
 
         while self.stack:
             r, c = self.stack.pop(0)
+            self.expanded += 1
 
             if (r,c) == (self.end_row,self.end_col):
                 self.solved = True
@@ -116,6 +183,7 @@ class bfs:
             nbrs = [ (nr,nc) for nr,nc in self.connected_nbrs(r,c) if not self.visited[nr][nc] ]
             
             if not nbrs: continue
+            self.visits += len(nbrs)
             for nr, nc in nbrs:
                 self.visited[nr][nc] = True
                 self.path_to[nr][nc] = (r,c)
@@ -128,8 +196,358 @@ class bfs:
         # mark the correct path
         (r,c) = (self.end_row,self.end_col)
         while (r,c) != (self.start_row,self.start_col):
+            self.path.append((r,c))
             self.visualizer.add_tile_state(r,c,mv.ST_CORRECT_PATH,redraw=self.animate)
             r,c = self.path_to[r][c]
 
+        self.path.append((r,c))
+        self.path.reverse()
         self.visualizer.add_tile_state(r,c,mv.ST_CORRECT_PATH,redraw=self.animate)
-        
\ No newline at end of file
+
+class FlatSolver:
+    '''
+    Base class for solvers working on flat cell indices, i = r*N + c. 
+
+    Parent links live in a flat int array, -1 marks unvisited cells. Walls are
+    only read through Maze.has_wall(), which reports the outer border as a
+    wall, so no bounds checks are needed. Subclasses implement search() and 
+    return the cell where the search reached the exit, or -1.
+
+    After solving `path` holds the (r,c) cells from start to finish, 
+    `expanded` the number of expanded cells, `visits` the number of cells 
+    visited and `elapsed` the wall-clock time of the search in seconds.
+    '''
+
+    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False, rng=None):
+        self.maze       = maze
+        self.visualizer = visualizer
+        self.start_row  = start_row
+        self.start_col  = start_col
+        self.end_row    = end_row
+        self.end_col    = end_col
+        self.animate    = animate
+
+        N = maze.N
+        self.start  = start_row*N + start_col
+        self.finish = end_row*N + end_col
+        self.moves  = ( (mz.NORTH,-N), (mz.SOUTH,N), (mz.WEST,-1), (mz.EAST,1) )
+
+        self.parent = self.new_parent()
+        self.expanded = 0
+        self.visits = 0
+        self.path = []
+        self.solved = False
+
+        # mark start and finish positions for the solver
+        self.visualizer.mark_exits(start_row, start_col,end_row, end_col)
+
+        started = time.perf_counter()
+        self.search()
+        self.elapsed = time.perf_counter() - started
+
+        # mark the correct path
+        for r, c in self.path:
+            self.visualizer.add_tile_state(r,c,mv.ST_CORRECT_PATH,redraw=self.animate)
+
+    def new_parent(self):
+        ''' returns a parent array with all cells unvisited '''
+        NN = self.maze.N ** 2
+        return array('i' if NN < 2**31 else 'q', [-1]) * NN
+
+    def trace(self, parent, i):
+        ''' returns a list of cell indices from i back to the root of parent links '''
+        cells = [ i ]
+        while parent[i] != i:
+            i = parent[i]
+            cells.append(i)
+        return cells
+
+    def set_path(self, cells):
+        self.solved = True
+        self.path = [ divmod(i, self.maze.N) for i in cells ]
+
+    def visit(self, i):
+        self.visits += 1
+
+        # just using DEADEND color to mark visited cells
+        r, c = divmod(i, self.maze.N)
+        self.visualizer.add_tile_state(r,c,mv.ST_DEADEND,redraw=self.animate)
+
+class fast_bfs(FlatSolver):
+    ''' BFS with a deque of cell indices '''
+
+    def search(self):
+        N, parent, has_wall = self.maze.N, self.parent, self.maze.has_wall
+
+        parent[self.start] = self.start
+        self.visit(self.start)
+        queue = deque([ self.start ])
+
+        while queue:
+            i = queue.popleft()
+            self.expanded += 1
+
+            if i == self.finish:
+                self.set_path(reversed(self.trace(parent, i)))
+                return
+
+            r, c = divmod(i, N)
+            for side, step in self.moves:
+                if has_wall(r,c,side): continue
+                j = i + step
+                if parent[j] >= 0: continue
+
+                parent[j] = i
+                self.visit(j)
+                queue.append(j)
+
+class astar(FlatSolver):
+    ''' A* search with the Manhattan distance to the exit as heuristic '''
+
+    def search(self):
+        N, parent, has_wall = self.maze.N, self.parent, self.maze.has_wall
+        er, ec = self.end_row, self.end_col
+
+        # cost from start, -1 for cells not reached yet
+        cost = self.new_parent()
+        closed = bytearray(N*N)
+
+        parent[self.start] = self.start
+        cost[self.start] = 0
+        self.visit(self.start)
+
+        # entries are (estimated total cost, -cost, cell), ties prefer deeper cells
+        heap = [ (abs(self.start_row-er) + abs(self.start_col-ec), 0, self.start) ]
+
+        while heap:
+            _, _, i = heapq.heappop(heap)
+            if closed[i]: continue
+            closed[i] = 1
+            self.expanded += 1
+
+            if i == self.finish:
+                self.set_path(reversed(self.trace(parent, i)))
+                return
+
+            r, c = divmod(i, N)
+            g = cost[i] + 1
+            for side, step in self.moves:
+                if has_wall(r,c,side): continue
+                j = i + step
+                if closed[j] or 0 <= cost[j] <= g: continue
+
+                if cost[j] < 0: self.visit(j)
+                cost[j] = g
+                parent[j] = i
+                nr, nc = divmod(j, N)
+                heapq.heappush(heap, (g + abs(nr-er) + abs(nc-ec), -g, j))
+
+class bidir_bfs(FlatSolver):
+    ''' 
+    Bidirectional BFS, grows the smaller of the two frontiers one level at a 
+    time until they meet
+    '''
+
+    def search(self):
+        N, has_wall = self.maze.N, self.maze.has_wall
+
+        # parents of cells reached from start and from finish
+        parents = ( self.parent, self.new_parent() )
+        parents[0][self.start] = self.start
+        parents[1][self.finish] = self.finish
+        self.visit(self.start)
+        self.visit(self.finish)
+
+        if self.start == self.finish:
+            self.set_path([ self.start ])
+            return
+
+        frontiers = [ [ self.start ], [ self.finish ] ]
+
+        while frontiers[0] and frontiers[1]:
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            parent, other = parents[side], parents[1-side]
+
+            level = []
+            for i in frontiers[side]:
+                self.expanded += 1
+                r, c = divmod(i, N)
+                for wall, step in self.moves:
+                    if has_wall(r,c,wall): continue
+                    j = i + step
+                    if parent[j] >= 0: continue
+
+                    parent[j] = i
+                    if other[j] >= 0:
+                        # frontiers met at j
+                        path = self.trace(parents[0], j)[::-1] + self.trace(parents[1], j)[1:]
+                        self.set_path(path)
+                        return
+
+                    self.visit(j)
+                    level.append(j)
+
+            frontiers[side] = level
+
+# headings to try in turn with the right hand on the wall: right, straight, left, back
+BACK = { mz.NORTH: mz.SOUTH, mz.SOUTH: mz.NORTH, mz.EAST: mz.WEST, mz.WEST: mz.EAST }
+RIGHT = { mz.NORTH: mz.EAST, mz.EAST: mz.SOUTH, mz.SOUTH: mz.WEST, mz.WEST: mz.NORTH }
+TURNS = { h: (RIGHT[h], h, BACK[RIGHT[h]], BACK[h]) for h in BACK }
+
+class Route:
+    '''
+    Route from a start cell as a stack of headings, one byte per step. A
+    step back along the last one cancels it, so dead ends walked into and
+    out of leave nothing behind.
+
+    Only up to `buffer` of the latest steps are kept in memory, older ones
+    are spilled to file, a binary file open for reading and writing, by
+    default a temporary file made on the first spill. After flush() the
+    file holds exactly the headings of the route.
+
+    len() is the number of cells of the route and iterating yields them as
+    (r,c), so a Route stands in for the path list of other solvers.
+    '''
+
+    def __init__(self, start_row, start_col, file=None, buffer=1 << 16):
+        self.start_row = start_row
+        self.start_col = start_col
+        self.file = file
+        self.buffer = buffer
+        self.tail = bytearray()
+        self.spilled = 0
+
+        if file is not None:
+            file.seek(0)
+            file.truncate()
+
+    def __len__(self):
+        return self.spilled + len(self.tail) + 1
+
+    def __iter__(self):
+        r, c = self.start_row, self.start_col
+        yield r, c
+
+        left = self.spilled
+        if left: self.file.seek(0)
+        while left:
+            data = self.file.read(min(left, self.buffer))
+            left -= len(data)
+            for h in data:
+                r, c = r + DR[h], c + DC[h]
+                yield r, c
+
+        for h in bytes(self.tail):
+            r, c = r + DR[h], c + DC[h]
+            yield r, c
+
+    def step(self, h):
+        ''' adds a step with heading h, returns False if it cancelled the last step instead '''
+        tail = self.tail
+        if not tail and self.spilled: self.unspill()
+
+        if tail and tail[-1] == BACK[h]:
+            tail.pop()
+            return False
+
+        tail.append(h)
+        if len(tail) >= self.buffer: self.spill()
+        return True
+
+    def spill(self):
+        ''' moves the older half of the steps in memory to the file '''
+        if self.file is None: self.file = tempfile.TemporaryFile()
+
+        n = len(self.tail) // 2
+        self.file.seek(self.spilled)
+        self.file.write(self.tail[:n])
+        del self.tail[:n]
+        self.spilled += n
+
+    def unspill(self):
+        ''' reads the latest steps back from the file '''
+        n = min(self.buffer // 2, self.spilled)
+        self.spilled -= n
+        self.file.seek(self.spilled)
+        self.tail[:0] = self.file.read(n)
+        self.file.truncate(self.spilled)
+
+    def flush(self):
+        ''' writes the whole route to the file, if there is one '''
+        if self.file is None: return
+
+        self.file.seek(self.spilled)
+        self.file.write(self.tail)
+        self.file.truncate()
+        self.file.flush()
+
+class wall_follower:
+    '''
+    Walks with the right hand on the wall until it reaches the exit. In a
+    perfect maze all walls are joined to the border, so the walk always
+    gets there, and with steps back along the route cancelled the route is
+    the only path between start and exit.
+
+    Memory does not depend on the maze size: there are no per-cell arrays,
+    walls are only read through maze.has_wall(), so memory-mapped and
+    chunked mazes work, and the route goes to a Route, which spills to the
+    binary file `route` if it is given, a temporary file otherwise. `path`
+    is that Route, `expanded` counts steps walked.
+
+    Mazes with loops may have exits the wall never leads to; the walk gives
+    up once it has gone through every passage both ways.
+    '''
+
+    def __init__(self, maze, visualizer, start_row, start_col, end_row, end_col, animate=False, rng=None, route=None):
+        self.maze       = maze
+        self.visualizer = visualizer
+        self.start_row  = start_row
+        self.start_col  = start_col
+        self.end_row    = end_row
+        self.end_col    = end_col
+        self.animate    = animate
+
+        self.solved = False
+        self.expanded = 0
+        self.path = Route(start_row, start_col, route)
+
+        # mark start and finish positions for the solver
+        self.visualizer.mark_exits(start_row, start_col, end_row, end_col)
+
+        started = time.perf_counter()
+        self.follow()
+        self.path.flush()
+        self.elapsed = time.perf_counter() - started
+
+        # the start cell and every cell stepped into
+        self.visits = self.expanded + 1
+
+    def follow(self):
+        has_wall, route, vis = self.maze.has_wall, self.path, self.visualizer
+        r, c = self.start_row, self.start_col
+        end = (self.end_row, self.end_col)
+
+        # every passage is walked at most once each way before the walk repeats
+        limit = 4 * self.maze.N ** 2
+
+        vis.add_tile_state(r,c, mv.ST_CORRECT_PATH, redraw=self.animate)
+
+        h = mz.NORTH
+        while (r,c) != end:
+            if self.expanded >= limit: return
+
+            for h in TURNS[h]:
+                if not has_wall(r,c,h): break
+            else:
+                # walled in
+                return
+
+            if not route.step(h): vis.set_tile_state(r,c, mv.ST_DEADEND)
+
+            r, c = r + DR[h], c + DC[h]
+            self.expanded += 1
+
+            vis.add_tile_state(r,c, mv.ST_CURRENT | mv.ST_CORRECT_PATH, redraw=self.animate)
+            vis.clear_tile_state(r,c, mv.ST_CURRENT)
+
+        self.solved = True
@@ -0,0 +1,176 @@
+'''
+Instrumentation of generators, solvers and the visualizer: operation
+counters and per-phase timers.
+
+Hooks need no help from the instrumented code. Stats.install() wraps the
+hot methods listed in HOOKS with counting versions, and the bulk writers
+in BULK_HOOKS with versions comparing the cells before and after, and
+uninstall() puts the originals back, so when stats are not installed
+there is no extra work at all. Cells visited are the exception:
+vectorized and random walk algorithms have no per-cell method to hook, so
+every generator and solver keeps a `visits` count, the times it entered
+or worked on a cell, revisits included, which the caller adds with
+Stats.count(). Phases are timed by the caller with Stats.phase(), which
+can also profile the phase with cProfile.
+'''
+
+import maze as mz
+import maze_generators as mg
+import UF
+import cProfile
+import functools
+import time
+from contextlib import contextmanager
+
+# (class, method, counter) of calls counted by installed stats
+HOOKS = [
+    (mz.Maze,                  'add_wall',    'walls added'),
+    (mz.Maze,                  'remove_wall', 'walls removed'),
+    (mz.Maze,                  'has_wall',    'wall queries'),
+    (UF.UF,                    'find',        'union-find finds'),
+    (mg.Frontier,              'add',         'frontier ops'),
+    (mg.Frontier,              'remove',      'frontier ops'),
+    (mg.Frontier,              'oldest',      'frontier ops'),
+    (mg.Frontier,              'newest',      'frontier ops'),
+    (mg.Frontier,              'kth',         'frontier ops'),
+]
+
+# (class, method, reader) of bulk writers, walls added and removed are
+# counted by reading the cells the call writes before and after it
+BULK_HOOKS = [
+    (mz.Maze, 'set_row',   lambda maze, r, codes: maze.get_row(r)),
+    (mz.Maze, 'set_col',   lambda maze, c, codes: maze.get_col(c)),
+    (mz.Maze, 'set_codes', lambda maze, codes: maze.get_codes().tobytes()),
+    (mz.Maze, 'remove_walls', lambda maze, cells, bit: maze.get_codes().tobytes()),
+]
+
+# visualizer methods timed as the render phase
+RENDER_METHODS = [ 'draw_maze', 'mark_exits', 'update_tk_maze', 'flush', 'redraw_tk_maze' ]
+
+class CountingProxy:
+    ''' forwards attribute access to obj, counting calls of its methods '''
+
+    def __init__(self, obj, counters, counter):
+        self._obj = obj
+        self._counters = counters
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._obj, name)
+        if not callable(attr): return attr
+
+        counters, counter = self._counters, self._counter
+        def counted(*args, **kwargs):
+            counters[counter] = counters.get(counter, 0) + 1
+            return attr(*args, **kwargs)
+        return counted
+
+class Stats:
+
+    def __init__(self):
+        self.counters = {}
+        self.timers = {}
+        self.hooks = []
+
+        # nesting depth of timed calls, only the outermost call is timed
+        self.depth = {}
+
+    def count(self, counter, n=1):
+        self.counters[counter] = self.counters.get(counter, 0) + n
+
+    @contextmanager
+    def phase(self, name, profile=None):
+        ''' times the enclosed block as phase name, dumps its cProfile stats to the profile file if given '''
+        profiler = cProfile.Profile() if profile else None
+        started = time.perf_counter()
+        if profiler: profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(profile)
+            self.timers[name] = self.timers.get(name, 0.0) + time.perf_counter() - started
+
+    def install(self):
+        ''' starts counting calls of HOOKS methods '''
+        for owner, name, counter in HOOKS:
+            original = owner.__dict__[name]
+            setattr(owner, name, self.counted(original, counter))
+            self.hooks.append((owner, name, original))
+
+        for owner, name, reader in BULK_HOOKS:
+            original = owner.__dict__[name]
+            setattr(owner, name, self.diffed(original, reader))
+            self.hooks.append((owner, name, original))
+
+    def uninstall(self):
+        ''' restores methods wrapped by install() '''
+        while self.hooks:
+            owner, name, original = self.hooks.pop()
+            setattr(owner, name, original)
+
+    def counted(self, fn, counter):
+        counters = self.counters
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            counters[counter] = counters.get(counter, 0) + 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    def diffed(self, fn, reader):
+        counters = self.counters
+
+        @functools.wraps(fn)
+        def wrapper(maze, *args):
+            before = reader(maze, *args)
+            result = fn(maze, *args)
+            after = reader(maze, *args)
+
+            # codes hold CELL_SOUTH and CELL_EAST bits, one wall each
+            removed = sum(bin(b & ~a).count('1') for b, a in zip(before, after))
+            added = sum(bin(a & ~b).count('1') for b, a in zip(before, after))
+            counters['walls removed'] = counters.get('walls removed', 0) + removed
+            counters['walls added'] = counters.get('walls added', 0) + added
+            return result
+        return wrapper
+
+    def timed(self, fn, timer):
+        timers, depth = self.timers, self.depth
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            depth[timer] = depth.get(timer, 0) + 1
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                depth[timer] -= 1
+                if not depth[timer]:
+                    timers[timer] = timers.get(timer, 0.0) + time.perf_counter() - started
+        return wrapper
+
+    def watch_visualizer(self, visualizer):
+        ''' counts canvas calls of a visualizer and times its drawing as the render phase '''
+        if visualizer.headless: return
+
+        if getattr(visualizer, 'canvas', None) is not None:
+            visualizer.canvas = CountingProxy(visualizer.canvas, self.counters, 'canvas calls')
+
+        for name in RENDER_METHODS:
+            if hasattr(visualizer, name):
+                setattr(visualizer, name, self.timed(getattr(visualizer, name), 'render'))
+
+    def report(self):
+        ''' returns a text summary of timers and counters '''
+        lines = [ 'Phases:' ]
+        for name, seconds in self.timers.items():
+            note = ' (overlaps generate and solve)' if name == 'render' else ''
+            lines.append('    %-20s %10.3f sec%s' % (name, seconds, note))
+
+        lines.append('Counters:')
+        for name, value in sorted(self.counters.items()):
+            lines.append('    %-20s %10d' % (name, value))
+
+        return '\n'.join(lines)
@@ -0,0 +1,144 @@
+'''
+Distance and path queries on perfect mazes.
+
+A perfect maze is a spanning tree of its cells, so there is exactly one path
+between any two cells and, once the tree is rooted, it goes through their
+lowest common ancestor. TreeIndex roots the maze at a cell and records
+parents and depths with a single BFS, then builds binary lifting tables:
+up[k][i] is the ancestor 2**k levels above cell i. Lowest common ancestors
+and distances then take O(log N) table lookups, and a path is found by
+walking only the cells on it.
+'''
+
+import maze as mz
+from array import array
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class TreeIndex:
+    '''
+    Index of a perfect NxN maze answering queries between any two cells.
+
+    The maze is read once through get_row(), so Maze and ChunkedMaze both
+    work, and later changes to it are not seen by the index. Raises
+    ValueError if the maze has loops or cells that cannot be reached.
+
+    Cells are flat indices, i = r*N + c; the root's parent is the root
+    itself. Lifting tables take height.bit_length() arrays of N*N ints.
+    '''
+
+    def __init__(self, maze, root=(0,0)):
+        N = maze.N
+        self.N = N
+        self.typecode = 'i' if N*N < 2**31 else 'q'
+        self.root = root[0]*N + root[1]
+
+        self.parent, self.depth, self.height = self.build(maze)
+        self.up = self.lift()
+
+    def build(self, maze):
+        ''' returns parent and depth arrays of the tree rooted at self.root, and its height '''
+        N, root = self.N, self.root
+
+        # cell codes, walls on the outer border are not reported
+        codes = b''.join(maze.get_row(r) for r in range(N))
+
+        parent = array(self.typecode, [-1]) * (N*N)
+        depth = array(self.typecode, [0]) * (N*N)
+        parent[root] = root
+        queue = deque([ root ])
+        reached = 1
+        d = 0
+
+        while queue:
+            i = queue.popleft()
+            r, c = divmod(i, N)
+            code, p, d = codes[i], parent[i], depth[i]
+
+            nbrs = []
+            if r > 0   and not codes[i-N] & mz.CELL_SOUTH: nbrs.append(i-N)
+            if r+1 < N and not code & mz.CELL_SOUTH:       nbrs.append(i+N)
+            if c > 0   and not codes[i-1] & mz.CELL_EAST:  nbrs.append(i-1)
+            if c+1 < N and not code & mz.CELL_EAST:        nbrs.append(i+1)
+
+            for j in nbrs:
+                if j == p: continue
+                if parent[j] >= 0:
+                    raise ValueError('Maze is not perfect: there is a loop at (%d, %d)' % divmod(j, N))
+                parent[j] = i
+                depth[j] = d + 1
+                queue.append(j)
+                reached += 1
+
+        if reached < N*N:
+            raise ValueError('Maze is not perfect: %d cells cannot be reached' % (N*N - reached))
+
+        # cells are dequeued in depth order, the last one is the deepest
+        return parent, depth, d
+
+    def lift(self):
+        ''' returns binary lifting tables, up[k][i] is the ancestor 2**k levels above cell i, or the root '''
+        up = [ self.parent ]
+
+        for _ in range(1, max(1, self.height.bit_length())):
+            prev = up[-1]
+            if np is not None:
+                a = np.frombuffer(prev, dtype=np.int32 if self.typecode == 'i' else np.int64)
+                table = array(self.typecode)
+                table.frombytes(a[a].tobytes())
+            else:
+                table = array(self.typecode, [ prev[p] for p in prev ])
+            up.append(table)
+
+        return up
+
+    def ancestor(self, i, n):
+        ''' returns the ancestor n levels above cell i, or the root '''
+        up, k = self.up, 0
+        while n:
+            if n & 1: i = up[k][i]
+            n >>= 1
+            k += 1
+        return i
+
+    def lca(self, a, b):
+        ''' returns the lowest common ancestor of cells a and b '''
+        depth, up = self.depth, self.up
+
+        if depth[a] < depth[b]: a, b = b, a
+        a = self.ancestor(a, depth[a] - depth[b])
+        if a == b: return a
+
+        for k in range(len(up)-1, -1, -1):
+            table = up[k]
+            if table[a] != table[b]: a, b = table[a], table[b]
+
+        return self.parent[a]
+
+    def distance(self, r1,c1,r2,c2):
+        ''' returns the number of steps between cells (r1,c1) and (r2,c2) '''
+        N, depth = self.N, self.depth
+        a, b = r1*N + c1, r2*N + c2
+        return depth[a] + depth[b] - 2*depth[self.lca(a, b)]
+
+    def path(self, r1,c1,r2,c2):
+        ''' returns the (r,c) cells of the path from (r1,c1) to (r2,c2), both included '''
+        N, parent = self.N, self.parent
+        a, b = r1*N + c1, r2*N + c2
+        top = self.lca(a, b)
+
+        head = [ a ]
+        while a != top:
+            a = parent[a]
+            head.append(a)
+
+        tail = []
+        while b != top:
+            tail.append(b)
+            b = parent[b]
+
+        return [ divmod(i, N) for i in head + tail[::-1] ]
@@ -1,6 +1,21 @@
+import sys
 import time
-import tkinter
+import importlib
 import maze as mz
+import maze_raster
+
+# tkinter is imported on first use, so headless runs never load Tk
+tkinter = None
+
+def load_tkinter():
+    ''' imports tkinter on demand, returns None if it is not available '''
+    global tkinter
+    if tkinter is None:
+        try:
+            tkinter = importlib.import_module('tkinter')
+        except ImportError:
+            pass
+    return tkinter
 
 # tile states
 ST_CURRENT      = 1 << 0
@@ -11,7 +26,53 @@ ST_CORRECT_PATH = 1 << 4
 ST_START        = 1 << 5
 ST_END          = 1 << 6
 
+def ascii_border(width):
+    ''' top border line for ascii_row() lines '''
+    return ' ' + '_' * (2*width - 1)
+
+def ascii_cells(codes, bottom=False):
+    ''' 
+    renders a row of cell codes (see Maze.get_row()) as a list of 
+    characters, one per terminal column: the south wall of each cell is 
+    followed by its east wall; set bottom to draw the outer wall below the 
+    last row
+    '''
+    line = [ '|' ]
+    for c, code in enumerate(codes):
+        south = bottom or code & mz.CELL_SOUTH
+        line.append('_' if south else ' ')
+
+        if c+1 < len(codes):
+            if code & mz.CELL_EAST: line.append('|')
+            # if two adj cells don't have a vertical wall and both have 
+            # SOUTH walls, draw "_" to make the horizontal wall look contiguous
+            elif south and (bottom or codes[c+1] & mz.CELL_SOUTH): line.append('_')
+            else: line.append(' ')
+
+    line.append('|')
+    return line
+
+def ascii_row(codes, bottom=False):
+    ''' renders a row of cell codes as a line of text, see ascii_cells() '''
+    return ''.join(ascii_cells(codes, bottom))
+
 class MazeVisualizer:
+    '''
+    Tk and terminal visualizer. Tile and wall changes are not drawn right 
+    away: update_tk_maze() marks cells dirty and redraw_tk_maze() repaints 
+    them at most once per frame (fps per second), only re-configuring canvas
+    items whose color actually changed. `delay` is the animation speed in 
+    seconds per redraw request, it is kept on average by sleeping once the 
+    animation runs a frame ahead of it.
+
+    With ascii=True the maze is also drawn on the terminal `out`: the first
+    frame is written in one go, later frames only move the cursor to 
+    characters that changed and rewrite them. Tk is not used if tk_root is 
+    None.
+    '''
+
+    # generators and solvers skip purely cosmetic work for headless visualizers
+    headless = False
 
     COLORS = {
         'BACKGROUND': 'white',
@@ -27,19 +88,46 @@ class MazeVisualizer:
         'DEADEND_TILE': 'lightgray'              
     }
 
-    def __init__(self, maze, tk_root, tile_width=10, wall_width=1, delay=0, ascii=False):
+    # ANSI background colors of tiles on the terminal, empty for none
+    ANSI = {
+        'START': '41',
+        'END': '42',
+        'TILE': '',
+        'CURRENT_TILE': '45',
+        'PATH_TILE': '105',
+        'CORRECT_PATH_TILE': '102',
+        'VISITED_TILE': '',
+        'DEADEND_TILE': '100'
+    }
+
+    def __init__(self, maze, tk_root, tile_width=10, wall_width=1, delay=0, ascii=False, fps=60, out=None):
         self.maze = maze
         self.tk_root = tk_root
         self.tile_width = tile_width
         self.wall_width = wall_width
         self.delay = delay 
+        self.frame_time = 1 / fps
+
+        # cells waiting for a repaint in update order, current fill of canvas items
+        self.drawn = False
+        self.dirty = {}
+        self.fills = {}
+
+        # time of the last repaint and the time the animation should be at
+        self.last_frame = 0
+        self.due = 0
 
         self.tile_state = [ [0] * maze.N for _ in range(maze.N) ]
 
         self.draw_ascii = ascii
         self.draw_tk = False
 
-        if tkinter is not None:
+        # terminal, characters shown for every maze row and exit tiles
+        self.out = out or sys.stdout
+        self.screen = None
+        self.exits = {}
+
+        if tk_root is not None and load_tkinter() is not None:
             self.draw_tk = True
 
             self.tiles      = []
@@ -59,32 +147,93 @@ class MazeVisualizer:
             self.status = tkinter.Label(tk_root, text = 'Initializing')
             self.status.pack()
 
-    def tile_color(self,r,c):
+    def tile_kind(self,r,c):
+        ''' returns the COLORS key of a tile '''
         if self.tile_state[r][c] & ST_CURRENT:
-            color = self.COLORS['CURRENT_TILE']  
+            kind = 'CURRENT_TILE'
         elif self.tile_state[r][c] & ST_START:
-            color = self.COLORS['START']                           
+            kind = 'START'
         elif self.tile_state[r][c] & ST_END:
-            color = self.COLORS['END']             
+            kind = 'END'
         elif self.tile_state[r][c] & ST_PATH:
-            color = self.COLORS['PATH_TILE']    
+            kind = 'PATH_TILE'
         elif self.tile_state[r][c] & ST_CORRECT_PATH:
-            color = self.COLORS['CORRECT_PATH_TILE']    
+            kind = 'CORRECT_PATH_TILE'
         elif self.tile_state[r][c] & ST_VISITED:
-            color = self.COLORS['VISITED_TILE']    
+            kind = 'VISITED_TILE'
         elif self.tile_state[r][c] & ST_DEADEND:
-            color = self.COLORS['DEADEND_TILE']                   
+            kind = 'DEADEND_TILE'
         else:
-            color = self.COLORS['TILE']
+            kind = 'TILE'
 
-        return color      
+        return kind
+
+    def tile_color(self,r,c):
+        return self.COLORS[self.tile_kind(r,c)]
 
     def draw_maze(self):
         if self.draw_ascii: self.draw_ascii_maze()
         if self.draw_tk:    self.update_tk_maze(0,0,redraw=True)
 
+    def write(self, text):
+        self.out.write(text)
+        self.out.flush()
+
+    def ascii_line(self, r):
+        ''' returns terminal characters of maze row r, tiles colored by their state '''
+        N = self.maze.N
+        line = ascii_cells(self.maze.get_row(r), bottom=(r == N-1))
+
+        for c in range(N):
+            kind = self.tile_kind(r,c)
+            if kind != 'CURRENT_TILE': kind = self.exits.get((r,c), kind)
+            if self.ANSI[kind]: line[2*c+1] = '\x1b[%sm%s\x1b[0m' % (self.ANSI[kind], line[2*c+1])
+
+        return line
+
     def draw_ascii_maze(self):
-        pass
+        ''' clears the terminal and writes the whole maze as one frame '''
+        self.screen = [ self.ascii_line(r) for r in range(self.maze.N) ]
+
+        frame = [ '\x1b[H\x1b[2J', ascii_border(self.maze.N), '\n' ]
+        for line in self.screen:
+            frame.extend(line)
+            frame.append('\n')
+        self.write(''.join(frame))
+
+    def flush_ascii(self):
+        ''' rewrites characters of rows with dirty cells that changed since the last frame '''
+        N = self.maze.N
+
+        # north walls of cells are drawn in the row above
+        rows = set()
+        for key in self.dirty:
+            r = key // N
+            rows.add(r)
+            if r > 0: rows.add(r-1)
+
+        out = []
+        for r in sorted(rows):
+            old, new = self.screen[r], self.ascii_line(r)
+            self.screen[r] = new
+
+            # one cursor move for every run of changed characters;
+            # the border is terminal row 1, maze row r is terminal row r+2
+            p = 0
+            while p < len(new):
+                if new[p] == old[p]:
+                    p += 1
+                    continue
+                q = p
+                while q < len(new) and new[q] != old[q]: q += 1
+                out.append('\x1b[%d;%dH' % (r+2, p+1))
+                out.extend(new[p:q])
+                p = q
+
+        if out:
+            # park the cursor on the status line below the maze
+            out.append('\x1b[%d;1H' % (N+2))
+            self.write(''.join(out))
 
     def init_tk_maze(self):
         '''
@@ -93,6 +242,7 @@ class MazeVisualizer:
         '''
 
         self.canvas.delete(tkinter.ALL)
+        self.fills = {}
 
         self.wall_south = [ [0] * self.maze.N for _ in range(self.maze.N) ]
         self.wall_east  = [ [0] * self.maze.N for _ in range(self.maze.N) ]
@@ -114,6 +264,7 @@ class MazeVisualizer:
                     fill=color,
                     width=0
                 )
+                self.fills[self.tiles[r][c]] = color
 
                 if self.maze.has_wall(r,c,mz.SOUTH): color=self.COLORS['WALL']
                 if r+1 < self.maze.N:
@@ -121,6 +272,7 @@ class MazeVisualizer:
                         (c+1)*width,(r+2)*width, 
                         (c+2)*width,(r+2)*width,
                         fill=color)
+                    self.init_wall(self.wall_south[r][c], color)
 
                 color = self.tile_color(r,c)
                 if self.maze.has_wall(r,c,mz.EAST): color=self.COLORS['WALL']
@@ -129,6 +281,7 @@ class MazeVisualizer:
                         (c+2)*width,(r+1)*width,
                         (c+2)*width,(r+2)*width,
                         fill=color)
+                    self.init_wall(self.wall_east[r][c], color)
 
         # exterior walls
 
@@ -146,9 +299,23 @@ class MazeVisualizer:
         self.canvas.create_line(x1,y1, x2,y1, fill=self.COLORS['BORDER'],width=3*self.wall_width,capstyle=tkinter.ROUND)
         self.canvas.create_line(x1,y2, x2,y2, fill=self.COLORS['BORDER'],width=3*self.wall_width,capstyle=tkinter.ROUND)
 
+        self.drawn = True
+
+    def init_wall(self, item, color):
+        self.fills[item] = color
+        # open walls go below closed ones, see set_wall()
+        if color != self.COLORS['WALL']: self.canvas.tag_lower(item)
+
     def mark_exits(self, r1,c1,r2,c2):
         ''' Creates entrance and exit in ext walls if necessary '''
 
+        if self.draw_ascii:
+            self.exits = { (r1,c1): 'START', (r2,c2): 'END' }
+            self.update_tk_maze(r1, c1)
+            self.update_tk_maze(r2, c2)
+
+        if not self.draw_tk: return
+
         width = self.tile_width + self.wall_width
 
         # handling r1,c1
@@ -211,57 +378,86 @@ class MazeVisualizer:
 
     def update_tk_maze(self,r,c,redraw=False):
         '''
-        Updates state of a single title, and redraws the change on request. Faster than draw_tk_maze(). 
+        Marks a single tile and its walls for repainting, and requests a redraw if asked to.
         '''
 
         # construct visual representation of a maze on first call
-        if len(self.tiles) == 0: self.init_tk_maze()
+        if self.draw_tk and not self.drawn: self.init_tk_maze()
+        if self.draw_ascii and self.screen is None: self.draw_ascii_maze()
 
+        # keep update order, the last update of a cell decides colors of shared walls
+        key = r*self.maze.N + c
+        self.dirty.pop(key, None)
+        self.dirty[key] = None
 
-        # inside walls
-        
-        color = self.tile_color(r,c)
+        if redraw: self.redraw_tk_maze()
+
+    def set_fill(self, item, color):
+        ''' configures a canvas item only if its color changes, returns True if it did '''
+        if self.fills.get(item) == color: return False
+        self.fills[item] = color
+        self.canvas.itemconfig(item, fill=color)
+        return True
 
+    def set_wall(self, item, closed, color):
+        if closed:
+            self.set_fill(item, self.COLORS['WALL'])
         # tag_lower avoids chipping joints of existing walls when removing a wall
-        if r > 0:
-            if self.maze.has_wall(r,c,mz.NORTH):
-                self.canvas.itemconfig(self.wall_south[r-1][c], fill='black')
-            else:
-                self.canvas.itemconfig(self.wall_south[r-1][c], fill=color)
-                self.canvas.tag_lower(self.wall_south[r-1][c])
-
-        if r < self.maze.N - 1:
-            if self.maze.has_wall(r,c,mz.SOUTH):
-                self.canvas.itemconfig(self.wall_south[r][c], fill='black')
-            else:
-                self.canvas.itemconfig(self.wall_south[r][c], fill=color)
-                self.canvas.tag_lower(self.wall_south[r][c])
-
-        if c > 0:
-            if self.maze.has_wall(r,c,mz.WEST):
-                self.canvas.itemconfig(self.wall_east[r][c-1], fill='black')
-            else:
-                self.canvas.itemconfig(self.wall_east[r][c-1], fill=color)
-                self.canvas.tag_lower(self.wall_east[r][c-1])
-
-        if c < self.maze.N - 1:
-            if self.maze.has_wall(r,c,mz.EAST):
-                self.canvas.itemconfig(self.wall_east[r][c], fill='black')
-            else:
-                self.canvas.itemconfig(self.wall_east[r][c], fill=color)
-                self.canvas.tag_lower(self.wall_east[r][c])
-
-        self.canvas.itemconfig(self.tiles[r][c], fill=color)
+        elif self.set_fill(item, color):
+            self.canvas.tag_lower(item)
 
-        if redraw: self.redraw_tk_maze()
+    def flush(self):
+        ''' repaints dirty cells '''
+        if self.draw_ascii and self.screen is not None: self.flush_ascii()
+        if self.draw_tk and self.drawn: self.flush_tk()
+        self.dirty.clear()
+
+    def flush_tk(self):
+        ''' repaints dirty cells on the canvas '''
+        N, has_wall = self.maze.N, self.maze.has_wall
+
+        for key in self.dirty:
+            r, c = divmod(key, N)
+            color = self.tile_color(r,c)
+
+            if r > 0:   self.set_wall(self.wall_south[r-1][c], has_wall(r,c,mz.NORTH), color)
+            if r < N-1: self.set_wall(self.wall_south[r][c],   has_wall(r,c,mz.SOUTH), color)
+            if c > 0:   self.set_wall(self.wall_east[r][c-1],  has_wall(r,c,mz.WEST), color)
+            if c < N-1: self.set_wall(self.wall_east[r][c],    has_wall(r,c,mz.EAST), color)
+
+            self.set_fill(self.tiles[r][c], color)
 
     def redraw_tk_maze(self):
-            self.canvas.update()   
-            self.sleep()   
+        '''
+        Requests a redraw. Dirty cells are repainted once a frame time has 
+        passed since the last repaint; with a delay every request moves the 
+        animation on by delay seconds and the visualizer sleeps whenever it 
+        gets a frame ahead.
+        '''
+        now = time.perf_counter()
+        wait = 0
+
+        if self.delay:
+            # never fall more than a frame behind, so a slow stretch is not followed by a rush
+            self.due = max(self.due, now - self.frame_time) + self.delay
+            wait = self.due - now
+
+        if wait >= self.frame_time or now - self.last_frame >= self.frame_time:
+            self.flush()
+            if self.draw_tk: self.canvas.update()
+            self.last_frame = time.perf_counter()
+
+            if wait >= self.frame_time: time.sleep(max(0, self.due - self.last_frame))
 
     def set_statusbar(self, text):
-        self.status.configure(text=text)
-        self.status.update()
+        # show pending changes along with the status
+        self.flush()
+
+        if self.draw_ascii and self.screen is not None:
+            self.write('\x1b[%d;1H\x1b[2K%s' % (self.maze.N+2, text))
+        if self.draw_tk:
+            self.status.configure(text=text)
+            self.status.update()
 
     def sleep(self):
         time.sleep(self.delay)
@@ -278,3 +474,88 @@ class MazeVisualizer:
     def clear_tile_state(self, r,c, state, redraw=False):
         self.tile_state[r][c] &= ~state
         self.update_tk_maze(r,c,redraw=redraw)
+
+class RasterVisualizer(MazeVisualizer):
+    '''
+    Tk visualizer drawing the maze into a maze_raster.Raster pixel buffer 
+    shown as a single PhotoImage, instead of a canvas item for every tile 
+    and wall. Startup time is proportional to the pixel count, and repaints
+    rewrite the pixels of dirty cells and put only the changed rows of 
+    cells into the image.
+    '''
+
+    def resolve_color(self, color):
+        try:
+            return maze_raster.rgb(color)
+        except ValueError:
+            # any other color Tk knows, winfo_rgb() returns 16 bit channels
+            return tuple(v >> 8 for v in self.tk_root.winfo_rgb(color))
+
+    def init_tk_maze(self):
+        self.canvas.delete(tkinter.ALL)
+
+        self.raster = maze_raster.Raster(self.maze.N, self.COLORS, 
+            tile_width=self.tile_width, wall_width=self.wall_width, resolve=self.resolve_color)
+        self.raster.draw_maze(self.maze, self.tile_color)
+
+        size = self.raster.size
+        self.image = tkinter.PhotoImage(width=size, height=size)
+        self.put_pixels(0, 0, size, size)
+        self.canvas.create_image(self.tile_width, self.tile_width, image=self.image, anchor=tkinter.NW)
+
+        self.drawn = True
+
+    def put_pixels(self, x, y, w, h):
+        ''' copies a rectangle of the raster into the image '''
+        self.image.tk.call(self.image.name, 'put', self.raster.ppm(x, y, w, h), '-format', 'ppm', '-to', x, y)
+
+    def flush_tk(self):
+        ''' repaints dirty cells in the raster and puts every changed row of cells into the image '''
+        N = self.maze.N
+
+        # column span of dirty cells in each row
+        spans = {}
+        for key in self.dirty:
+            r, c = divmod(key, N)
+            self.raster.draw_cell(self.maze, r, c, self.tile_color)
+            lo, hi = spans.get(r, (c, c))
+            spans[r] = (min(lo, c), max(hi, c))
+
+        for r, (lo, hi) in spans.items():
+            x, y, _, h = self.raster.cell_box(r, lo)
+            w = (hi - lo + 1) * self.raster.pitch + self.wall_width
+            self.put_pixels(x, y, w, h)
+
+    def mark_exits(self, r1,c1,r2,c2):
+        ''' Colors the border next to entrance and exit, or their tiles if they are inside the maze '''
+
+        if not self.drawn: self.init_tk_maze()
+
+        for r, c, color, state in ((r1,c1,'START',ST_START), (r2,c2,'END',ST_END)):
+            if self.raster.mark_exit(r, c, self.COLORS[color]): self.update_tk_maze(r, c)
+            else: self.add_tile_state(r, c, state)
+
+class NullVisualizer:
+    '''
+    Headless visualizer: accepts the MazeVisualizer calls made by generators
+    and solvers and does nothing, so runs without animation pay no drawing
+    cost and never import tkinter.
+    '''
+
+    headless = True
+
+    def __init__(self, maze=None, *args, **kwargs):
+        self.maze = maze
+
+    def _noop(self, *args, **kwargs):
+        pass
+
+    draw_maze        = _noop
+    mark_exits       = _noop
+    update_tk_maze   = _noop
+    redraw_tk_maze   = _noop
+    set_statusbar    = _noop
+    sleep            = _noop
+    set_tile_state   = _noop
+    add_tile_state   = _noop
+    clear_tile_state = _noop